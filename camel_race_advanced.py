@@ -1,339 +1,36 @@
-import random
 import time
+IMPORT_STARTED_AT = time.perf_counter()  # 用於計算啟動到第一個畫面的時間
 import os
-import json
-import openpyxl
+import shutil
 import numpy as np
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, colorchooser
 from tkinter import Label, Entry, Button, StringVar, font, Canvas, Frame, Scale, OptionMenu
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import matplotlib.animation as animation
-import matplotlib as mpl
 import sys
-
-# 獲取字體路徑函數
-def get_font_path():
-    # 優先使用打包時包含的字體
-    bundled_font = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "msjh.ttc")
-    
-    # 如果存在捆綁字體則使用
-    if os.path.exists(bundled_font):
-        return bundled_font
-    
-    # 回退到系統字體
-    system_fonts = [
-        "./fonts/msjh.ttc",  # 微軟正黑體
-        "C:/Windows/Fonts/simsun.ttc",  # 新細明體
-        "C:/Windows/Fonts/kaiu.ttf",   # 標楷體
-    ]
-    
-    for font_path in system_fonts:
-        if os.path.exists(font_path):
-            return font_path
-    
-    # 如果找不到任何字體，回傳None
-    return None
-
-# 獲取字體路徑
-chinese_font_path = get_font_path()
-
-# 設定 matplotlib 中文字體
-plt.rcParams['axes.unicode_minus'] = False
-
-# 如果找到了中文字體
-if chinese_font_path:
-    # 自訂字體
-    font_prop = mpl.font_manager.FontProperties(fname=chinese_font_path)
-    
-    # 如果可能的話註冊字體
-    try:
-        font_path = os.path.abspath(chinese_font_path)
-        font_files = mpl.font_manager.findSystemFonts(fontpaths=[os.path.dirname(font_path)])
-        for font_file in font_files:
-            mpl.font_manager.fontManager.addfont(font_file)
-    except:
-        pass
-        
-    # 設定 matplotlib 字體
-    plt.rcParams['font.sans-serif'] = ['Microsoft JhengHei', 'SimHei', 'Arial Unicode MS', 'sans-serif']
-else:
-    # 預設字體列表
-    plt.rcParams['font.sans-serif'] = ['Microsoft JhengHei', 'SimHei', 'Arial Unicode MS', 'sans-serif']
-    font_prop = None
-    print("警告: 找不到中文字體，圖表可能無法正確顯示中文")
+import io
+import base64
+import queue
+import threading
+import itertools
+from camel_race_core import (CAMEL_COLORS, DEFAULT_CAMEL_COUNT, DEFAULT_TRACK_LENGTH, DEFAULT_SIMULATION_COUNT,
+                             RETENTION_FULL, RETENTION_FINAL, RETENTION_AGGREGATE, RETENTION_LABELS,
+                             ANIMATION_SPEED, CONFIDENCE_Z, RuleSet, RaceStats, CamelRace, iter_race_rows,
+                             collect_race_columns)
+from camel_race_fonts import font_prop
 
 # 全局變量
-CAMEL_COLORS = ["#FF5722", "#2196F3", "#4CAF50", "#9C27B0", "#FFC107"]
-DEFAULT_CAMEL_COUNT = 5
-DEFAULT_TRACK_LENGTH = 15
-DEFAULT_SIMULATION_COUNT = 10000
-ANIMATION_SPEED = 50  # 毫秒
+RESIZE_DEBOUNCE_MS = 150  # 視窗縮放停止後多久重新繪製圖表
+DEFAULT_MEMORY_BUDGET_MB = 1024  # 圖形介面預設的結果記憶體上限
+GUI_CHECKPOINT_DIR = os.path.join(os.path.expanduser("~"), ".camel_race_advanced", "checkpoint")  # 可續跑模擬的檢查點目錄
+GUI_CHECKPOINT_CHUNK_SIZE = 5000  # 可續跑模擬每個分塊的場數（關閉視窗時最多等待一個分塊）
 
-class CamelRace:
-    """駱駝競速模擬核心類"""
-    
-    def __init__(self, camel_count=DEFAULT_CAMEL_COUNT, track_length=DEFAULT_TRACK_LENGTH):
-        """初始化競賽參數"""
-        self.camel_count = camel_count
-        self.track_length = track_length
-        self.camel_names = [chr(65 + i) for i in range(camel_count)]  # A, B, C, ...
-        self.x_positions = [1] * camel_count  # 默認起始位置為1
-        self.y_positions = [1] * camel_count  # 默認起始高度為1
-        self.colors = CAMEL_COLORS[:camel_count]  # 駱駝顏色
-        self.results = []  # 模擬結果
-        self.winning_stats = {}  # 獲勝統計
-        self.current_simulation = 0  # 當前模擬次數
-        
-    def set_position(self, camel_index, x, y):
-        """設定駱駝初始位置"""
-        if 0 <= camel_index < self.camel_count:
-            self.x_positions[camel_index] = x
-            self.y_positions[camel_index] = y
-            
-    def validate_positions(self):
-        """檢查駱駝初始座標合理性"""
-        # 分類（x座標重複組、不重複組）
-        repeat_group = []
-        non_repeat_group = []
-        
-        # 找出重複和非重複的座標
-        for i in range(self.camel_count):
-            repeat_count = self.x_positions.count(self.x_positions[i])
-            if repeat_count > 1:
-                repeat_group.append([self.x_positions[i], self.y_positions[i], i])
-            if repeat_count == 1:
-                non_repeat_group.append([self.x_positions[i], self.y_positions[i], i])
-        
-        # 檢查非重複組y座標
-        for camel in non_repeat_group:
-            if camel[1] != 1:
-                return False, f"駱駝{self.camel_names[camel[2]]}起始堆疊高度有誤（單獨駱駝的y座標必須為1）"
-        
-        # 處理重複座標組
-        if not repeat_group:
-            return True, ""
-            
-        # 按x座標分組
-        x_values = set(item[0] for item in repeat_group)
-        for x_val in x_values:
-            same_x_camels = [item for item in repeat_group if item[0] == x_val]
-            # 按y座標排序
-            same_x_camels.sort(key=lambda item: item[1])
-            
-            # 確認y座標連續且從1開始
-            if same_x_camels[0][1] != 1:
-                return False, f"x={x_val} 位置的駱駝起始堆疊高度有誤（最底層駱駝的y座標必須為1）"
-                
-            for i in range(1, len(same_x_camels)):
-                if same_x_camels[i][1] - same_x_camels[i-1][1] != 1:
-                    return False, f"x={x_val} 位置的駱駝堆疊必須連續"
-        
-        return True, ""
-        
-    def simulate_one_race(self):
-        """模擬一場比賽"""
-        # 初始化駱駝位置
-        camels = []
-        for i in range(self.camel_count):
-            camels.append([self.camel_names[i], self.x_positions[i], self.y_positions[i]])
-        
-        # 記錄每一步的移動
-        race_history = [camels.copy()]
-        
-        # 打亂駱駝移動順序
-        random.shuffle(camels)
-        
-        # 移動駱駝直到有駱駝到達終點
-        finished = False
-        steps = 0
-        
-        while not finished and steps < 100:  # 設限防止無限循環
-            steps += 1
-            
-            # 決定移動順序
-            move_steps = [random.randint(1, 3) for _ in range(self.camel_count)]
-            
-            # 移動駱駝
-            for n in range(self.camel_count):
-                # 備份原始位置
-                original_positions = [c.copy() for c in camels]
-                
-                # 決定哪些駱駝會移動
-                moves = [0] * self.camel_count
-                for i in range(self.camel_count):
-                    if camels[n][1] == camels[i][1] and camels[n][2] <= camels[i][2]:
-                        moves[i] = move_steps[n]
-                
-                # 執行x座標移動
-                for m in range(self.camel_count):
-                    camels[m][1] += moves[m]
-                    
-                    # 檢查是否有駱駝到達終點
-                    if camels[m][1] >= self.track_length:
-                        finished = True
-                
-                # y座標校正
-                same_x_count = sum(1 for j in range(self.camel_count) 
-                                 if original_positions[j][1] == camels[n][1] and j != n)
-                
-                for k in range(self.camel_count):
-                    if moves[k] > 0:
-                        new_y = camels[k][2] - camels[n][2] + 1 + same_x_count
-                        camels[k][2] = new_y
-                
-                # 記錄這一步後的狀態
-                race_history.append([c.copy() for c in camels])
-        
-        # 根據駱駝名稱排序
-        final_state = sorted([c.copy() for c in camels], key=lambda x: x[0])
-        
-        # 計算獲勝者（最接近或超過終點線的駱駝）
-        winner_idx = max(range(self.camel_count), key=lambda i: final_state[i][1])
-        winner = final_state[winner_idx][0]
-        
-        return {
-            "final_positions": final_state,
-            "history": race_history,
-            "winner": winner,
-            "steps": steps
-        }
-        
-    def simulate_races(self, count=DEFAULT_SIMULATION_COUNT, progress_callback=None):
-        """執行多次模擬"""
-        self.results = []
-        self.winning_stats = {name: 0 for name in self.camel_names}
-        self.current_simulation = 0
-        
-        for i in range(count):
-            self.current_simulation = i + 1
-            race_result = self.simulate_one_race()
-            self.results.append(race_result)
-            self.winning_stats[race_result["winner"]] += 1
-            
-            # 進度回調
-            if progress_callback and i % (count // 100 or 1) == 0:
-                progress_callback(i, count)
-        
-        return self.analyze_results()
-    
-    def analyze_results(self):
-        """分析模擬結果"""
-        if not self.results:
-            return None
-            
-        # 獲勝率
-        total_races = len(self.results)
-        win_rates = {name: (count / total_races) * 100 
-                     for name, count in self.winning_stats.items()}
-        
-        # 計算每隻駱駝的平均終點位置
-        final_positions = []
-        for result in self.results:
-            positions = [camel[1] for camel in result["final_positions"]]
-            final_positions.append(positions)
-            
-        avg_positions = np.mean(final_positions, axis=0)
-        std_positions = np.std(final_positions, axis=0)
-        
-        # 計算勝率排名
-        ranking = sorted(win_rates.items(), key=lambda x: x[1], reverse=True)
-        
-        return {
-            "win_rates": win_rates,
-            "avg_positions": avg_positions,
-            "std_positions": std_positions,
-            "ranking": ranking,
-            "total_races": total_races
-        }
-        
-    def export_to_excel(self, filename="駱駝競速高級模擬結果.xlsx"):
-        """將結果匯出到Excel檔案"""
-        if not self.results:
-            return False
-            
-        analysis = self.analyze_results()
-        if not analysis:
-            return False
-            
-        # 創建Excel工作簿
-        wb = openpyxl.Workbook()
-        
-        # 主要結果表
-        sheet1 = wb.active
-        sheet1.title = "模擬結果摘要"
-        
-        # 設置表頭
-        sheet1['A1'] = '駱駝'
-        sheet1['B1'] = '獲勝次數'
-        sheet1['C1'] = '獲勝率 (%)'
-        sheet1['D1'] = '平均終點位置'
-        sheet1['E1'] = '標準差'
-        
-        # 填充數據
-        for i, name in enumerate(self.camel_names):
-            sheet1.cell(i+2, 1, name)
-            sheet1.cell(i+2, 2, self.winning_stats[name])
-            sheet1.cell(i+2, 3, analysis["win_rates"][name])
-            sheet1.cell(i+2, 4, analysis["avg_positions"][i])
-            sheet1.cell(i+2, 5, analysis["std_positions"][i])
-        
-        # 詳細結果表
-        sheet2 = wb.create_sheet("詳細模擬數據")
-        
-        # 設置表頭
-        sheet2['A1'] = '模擬次數'
-        for i, name in enumerate(self.camel_names):
-            sheet2.cell(1, i+2, f'駱駝{name}')
-        sheet2['G1'] = '獲勝者'
-        
-        # 填充數據
-        for i, result in enumerate(self.results[:10000]):  # 限制最多10000行
-            sheet2.cell(i+2, 1, i+1)
-            for j, camel in enumerate(result["final_positions"]):
-                sheet2.cell(i+2, j+2, camel[1])
-            sheet2.cell(i+2, 7, result["winner"])
-        
-        # 保存結果
-        wb.save(filename)
-        return True
-        
-    def save_configuration(self, filename="camel_race_config.json"):
-        """保存當前配置"""
-        config = {
-            "camel_count": self.camel_count,
-            "track_length": self.track_length,
-            "x_positions": self.x_positions,
-            "y_positions": self.y_positions,
-            "colors": self.colors
-        }
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4)
-        
-        return True
-        
-    def load_configuration(self, filename="camel_race_config.json"):
-        """載入配置"""
-        if not os.path.exists(filename):
-            return False
-            
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                
-            self.camel_count = config.get("camel_count", DEFAULT_CAMEL_COUNT)
-            self.track_length = config.get("track_length", DEFAULT_TRACK_LENGTH)
-            self.x_positions = config.get("x_positions", [1] * self.camel_count)
-            self.y_positions = config.get("y_positions", [1] * self.camel_count)
-            self.colors = config.get("colors", CAMEL_COLORS[:self.camel_count])
-            self.camel_names = [chr(65 + i) for i in range(self.camel_count)]
-            
-            return True
-        except:
-            return False
+# 即時預覽
+PREVIEW_DEBOUNCE_MS = 200  # 最後一次編輯後等待多久才開始模擬
+PREVIEW_TIME_BUDGET = 0.05  # 每一輪模擬的時間預算（秒），第一輪結果在此時間內出現
+PREVIEW_IDLE_PAUSE = 0.01  # 每一輪之間讓出給介面執行緒的時間（秒）
+PREVIEW_MAX_RACES = 50000  # 背景持續精煉的場數上限
+PREVIEW_TARGET_ERROR = 0.5  # 所有駱駝的95%誤差範圍都小於此值（百分點）時停止精煉
+PREVIEW_Z = CONFIDENCE_Z  # 95%信賴區間
 
 # 視覺化組件
 class TrackVisualizer:
@@ -455,7 +152,7 @@ class TrackVisualizer:
 
 # 結果視覺化類
 class ResultVisualizer:
-    """結果視覺化類"""
+    """結果視覺化類（圖表在背景執行緒以 Agg 繪製，完成後才貼到介面上）"""
     
     def __init__(self, master, race, width=600, height=400):
         """初始化視覺化組件"""
@@ -464,31 +161,148 @@ class ResultVisualizer:
         self.width = width
         self.height = height
         
-        # 創建畫布
+        # 創建畫布（顯示背景繪製完成的圖片）
         self.frame = Frame(master)
-        
-        # 使用Matplotlib繪製圖表
-        self.figure = Figure(figsize=(width/100, height/100), dpi=100)
-        self.canvas = FigureCanvasTkAgg(self.figure, self.frame)
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        
-    def plot_results(self, analysis):
-        """繪製模擬結果"""
+        # 不加邊框，圖片大小與元件大小一致，避免縮放時反覆觸發重繪
+        self.image_label = Label(self.frame, bg='white', borderwidth=0, highlightthickness=0)
+        self.image_label.pack(fill=tk.BOTH, expand=True)
+        self.image_label.bind("<Configure>", self.on_resize)
+        self.photo = None
+        
+        # 最近一次繪製的資料快照與尺寸（視窗縮放時以新尺寸重新繪製）
+        self._last_plot = None
+        self._rendered_size = None
+        self._resize_id = None
+        
+        # 背景繪製相關：只保留最新一次的繪製請求，舊的請求直接捨棄
+        self.generation = 0  # 最新請求的編號
+        self.displayed_generation = 0  # 目前顯示的圖片編號
+        self._pending = None
+        self._condition = threading.Condition()
+        self._rendered = queue.Queue()
+        self._poll_id = None
+        self._worker = threading.Thread(target=self._render_loop, daemon=True)
+        self._worker.start()
+        
+    @property
+    def is_rendering(self):
+        """是否有尚未顯示的繪製請求"""
+        return self.displayed_generation != self.generation
+        
+    def plot_results(self, analysis, races=None):
+        """繪製模擬結果（races 可傳入 iter_races 的串流作為箱形圖資料來源）"""
         if not analysis:
             return
             
-        self.figure.clear()
+        # 收集各次模擬的最終位置數據（在呼叫端執行緒完成，背景執行緒只處理快照）
+        position_data = [[] for _ in range(self.race.camel_count)]
+        rows = iter_race_rows(self.race.results if races is None else races, self.race.camel_names)
+        for _, positions in itertools.islice(rows, 1000):  # 限制使用前1000個結果以提高性能
+            for i, x in enumerate(positions):
+                position_data[i].append(x)
+                
+        self._last_plot = (analysis, position_data, list(self.race.camel_names), list(self.race.colors))
+        self._request_render()
+        
+    def _current_size(self):
+        """元件目前的大小（尚未顯示時使用預設大小）"""
+        width = self.image_label.winfo_width()
+        height = self.image_label.winfo_height()
+        if width <= 1 or height <= 1:
+            width, height = self.width, self.height
+        return width, height
+        
+    def _request_render(self):
+        """依元件目前大小送出最近一次資料的背景繪製請求"""
+        width, height = self._current_size()
+        self._rendered_size = (width, height)
+        with self._condition:
+            self.generation += 1
+            self._pending = (self.generation, width, height) + self._last_plot
+            self._condition.notify()
+            
+        if self._poll_id is None:
+            self._poll_id = self.master.after(30, self._poll_rendered)
+            
+    def on_resize(self, event):
+        """元件大小改變：縮放停止後以新尺寸重新繪製最近一次的圖表"""
+        if self._last_plot is None:
+            return
+        if self._resize_id is not None:
+            self.master.after_cancel(self._resize_id)
+        self._resize_id = self.master.after(RESIZE_DEBOUNCE_MS, self._redraw_if_resized)
+        
+    def _redraw_if_resized(self):
+        """大小與目前圖片不同時重新繪製"""
+        self._resize_id = None
+        if self._current_size() != self._rendered_size:
+            self._request_render()
+            
+    def _render_loop(self):
+        """背景繪製執行緒：重複使用同一個 Agg 圖表繪製最新的請求"""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        figure = Figure(figsize=(self.width/100, self.height/100), dpi=100)
+        canvas = FigureCanvasAgg(figure)
+        
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                generation, width, height, analysis, position_data, camel_names, colors = self._pending
+                self._pending = None
+                
+            try:
+                figure.set_size_inches(width/100, height/100)
+                self.draw_figure(figure, analysis, position_data, camel_names, colors)
+                
+                # 繪製期間已有新資料時不必輸出這張圖
+                if generation != self.generation:
+                    continue
+                    
+                buffer = io.BytesIO()
+                canvas.print_png(buffer)
+                self._rendered.put((generation, base64.b64encode(buffer.getvalue())))
+            except Exception as e:
+                print(f"圖表繪製錯誤: {str(e)}")
+                self._rendered.put((generation, None))
+                
+    def _poll_rendered(self):
+        """在介面執行緒取回繪製完成的圖片並顯示"""
+        self._poll_id = None
+        latest = None
+        while True:
+            try:
+                latest = self._rendered.get_nowait()
+            except queue.Empty:
+                break
+                
+        if latest is not None:
+            generation, data = latest
+            # 只顯示最新請求的結果
+            if generation == self.generation:
+                if data is not None:
+                    self.photo = tk.PhotoImage(data=data)
+                    self.image_label.configure(image=self.photo)
+                self.displayed_generation = generation
+                
+        if self.is_rendering:
+            self._poll_id = self.master.after(30, self._poll_rendered)
+            
+    def draw_figure(self, figure, analysis, position_data, camel_names, colors):
+        """在指定的圖表上繪製模擬結果"""
+        figure.clear()
         
         # 設置標題
-        self.figure.suptitle('駱駝競速模擬結果分析', fontsize=14, fontproperties=font_prop)
+        figure.suptitle('駱駝競速模擬結果分析', fontsize=14, fontproperties=font_prop)
         
         # 獲勝率餅圖
-        ax1 = self.figure.add_subplot(221)
+        ax1 = figure.add_subplot(221)
         labels = list(analysis["win_rates"].keys())
         sizes = list(analysis["win_rates"].values())
-        colors = self.race.colors[:len(labels)]
+        pie_colors = colors[:len(labels)]
         
-        patches, texts, autotexts = ax1.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%',
+        patches, texts, autotexts = ax1.pie(sizes, labels=labels, colors=pie_colors, autopct='%1.1f%%',
                 shadow=True, startangle=90)
         
         # 設置餅圖文字顏色
@@ -502,20 +316,20 @@ class ResultVisualizer:
         ax1.set_title('獲勝率分佈', fontproperties=font_prop)
         
         # 平均終點位置柱狀圖
-        ax2 = self.figure.add_subplot(222)
-        x = range(len(self.race.camel_names))
+        ax2 = figure.add_subplot(222)
+        x = range(len(camel_names))
         ax2.bar(x, analysis["avg_positions"], yerr=analysis["std_positions"],
-               color=colors, align='center', alpha=0.7, ecolor='black', capsize=10)
+               color=pie_colors, align='center', alpha=0.7, ecolor='black', capsize=10)
         ax2.set_xticks(x)
-        ax2.set_xticklabels(self.race.camel_names)
+        ax2.set_xticklabels(camel_names)
         ax2.set_ylabel('平均終點位置', fontproperties=font_prop)
         ax2.set_title('終點位置分析', fontproperties=font_prop)
         
         # 勝率排名
-        ax3 = self.figure.add_subplot(223)
+        ax3 = figure.add_subplot(223)
         ranking_names = [r[0] for r in analysis["ranking"]]
         ranking_rates = [r[1] for r in analysis["ranking"]]
-        ranking_colors = [self.race.colors[ord(name) - ord('A')] for name in ranking_names]
+        ranking_colors = [colors[ord(name) - ord('A')] for name in ranking_names]
         
         ax3.barh(range(len(ranking_names)), ranking_rates, color=ranking_colors, align='center')
         ax3.set_yticks(range(len(ranking_names)))
@@ -525,26 +339,472 @@ class ResultVisualizer:
         ax3.set_title('獲勝率排行', fontproperties=font_prop)
         
         # 位置分佈箱形圖
-        ax4 = self.figure.add_subplot(224)
-        # 收集各次模擬的最終位置數據
-        position_data = [[] for _ in range(self.race.camel_count)]
-        for result in self.race.results[:1000]:  # 限制使用前1000個結果以提高性能
-            for i, camel in enumerate(result["final_positions"]):
-                position_data[i].append(camel[1])
-        
-        ax4.boxplot(position_data, labels=self.race.camel_names, patch_artist=True)
+        ax4 = figure.add_subplot(224)
+        if any(position_data):
+            ax4.boxplot(position_data, labels=camel_names, patch_artist=True)
+        else:
+            # 僅保留統計數據時沒有逐場資料
+            ax4.text(0.5, 0.5, '無逐場資料', ha='center', va='center', fontproperties=font_prop)
         ax4.set_ylabel('終點位置', fontproperties=font_prop)
         ax4.set_title('終點位置分佈', fontproperties=font_prop)
         
         # 調整佈局
-        self.figure.tight_layout(rect=[0, 0, 1, 0.95])
-        self.canvas.draw()
+        figure.tight_layout(rect=[0, 0, 1, 0.95])
+
+# 逐場結果瀏覽類
+class ResultBrowser:
+    """逐場結果瀏覽類（虛擬化表格：只建立可見範圍的列，捲動時重新填入內容）"""
+    
+    FILTER_OPERATORS = ["==", "!=", ">=", ">", "<=", "<"]
+    
+    def __init__(self, master, race, on_replay=None):
+        """初始化瀏覽組件"""
+        self.master = master
+        self.race = race
+        self.on_replay = on_replay
+        
+        # 資料（欄位陣列）與目前的檢視（篩選、排序後的比賽索引）
+        self.columns = None
+        self.query = None
+        self.view = np.empty(0, dtype=np.int64)
+        self.offset = 0  # 可見範圍第一列在檢視中的位置
+        self.visible_rows = 20
+        self.selected_position = None  # 選取的列在檢視中的位置
+        self.sort_column = None
+        self.sort_descending = False
+        self._source = None
+        self._row_races = {}  # 表格項目 -> 比賽索引
+        
+        self.frame = Frame(master, bg="#f0f0f0")
+        self.create_filter_bar()
+        self.create_table()
+        
+    def create_filter_bar(self):
+        """創建篩選區域"""
+        bar = Frame(self.frame, bg="#f0f0f0")
+        bar.pack(fill=tk.X, pady=5)
+        
+        Label(bar, text="獲勝者:", bg="#f0f0f0").pack(side=tk.LEFT)
+        self.winner_var = StringVar(value="全部")
+        self.winner_box = ttk.Combobox(bar, textvariable=self.winner_var, width=6, state="readonly")
+        self.winner_box.pack(side=tk.LEFT, padx=5)
+        
+        Label(bar, text="終點位置:", bg="#f0f0f0").pack(side=tk.LEFT, padx=(10, 0))
+        self.position_camel_var = StringVar(value="不限")
+        self.position_camel_box = ttk.Combobox(bar, textvariable=self.position_camel_var, width=6, state="readonly")
+        self.position_camel_box.pack(side=tk.LEFT, padx=5)
+        self.position_op_var = StringVar(value=">=")
+        ttk.Combobox(bar, textvariable=self.position_op_var, values=self.FILTER_OPERATORS,
+                     width=4, state="readonly").pack(side=tk.LEFT)
+        self.position_value_entry = Entry(bar, width=6)
+        self.position_value_entry.pack(side=tk.LEFT, padx=5)
+        
+        Button(bar, text="套用篩選", command=self.apply_filter, bg="#2196F3", fg="white",
+              padx=10).pack(side=tk.LEFT, padx=5)
+        Button(bar, text="清除篩選", command=self.clear_filter, bg="#9E9E9E", fg="white",
+              padx=10).pack(side=tk.LEFT, padx=5)
+        Button(bar, text="重播此場", command=self.replay_selected, bg="#4CAF50", fg="white",
+              padx=10).pack(side=tk.LEFT, padx=5)
+        
+        self.count_var = StringVar(value="尚無逐場結果")
+        Label(bar, textvariable=self.count_var, bg="#f0f0f0").pack(side=tk.RIGHT, padx=5)
+        
+    def create_table(self):
+        """創建表格與捲軸"""
+        table = Frame(self.frame)
+        table.pack(fill=tk.BOTH, expand=True)
+        
+        self.tree = ttk.Treeview(table, show="headings", selectmode="browse")
+        self.scrollbar = ttk.Scrollbar(table, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.set_headings()
+        
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_rows(3))
+        self.tree.bind("<Up>", lambda event: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda event: self.scroll_rows(-self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self.scroll_rows(self.visible_rows))
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<Double-1>", lambda event: self.replay_selected())
+        
+    def set_headings(self):
+        """依駱駝數量設定表格欄位"""
+        columns = ["race", "winner", "steps"] + [f"camel_{i}" for i in range(self.race.camel_count)]
+        headings = ["場次", "獲勝者", "回合數"] + [f"駱駝{name}位置" for name in self.race.camel_names]
+        self.tree.configure(columns=columns)
+        for column, heading in zip(columns, headings):
+            self.tree.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=80, anchor=tk.CENTER)
+        
+        self.winner_box.configure(values=["全部"] + self.race.camel_names)
+        self.position_camel_box.configure(values=["不限"] + self.race.camel_names)
+        
+    def load(self):
+        """載入目前保存的逐場結果（結果未變更時不重新載入）"""
+        if not self.is_stale():
+            return
+        self._source = (self.race, self.race.results_generation)
+        results = self.race.results
+        
+        from camel_race_query import RaceQuery
+        self.set_headings()
+        if results:
+            self.columns = collect_race_columns(results, self.race.camel_names)
+            self.query = RaceQuery(self.race.camel_names, self.columns["winners"],
+                                   self.columns["positions"], self.columns["heights"])
+        else:
+            self.columns = None
+            self.query = None
+        self.sort_column = None
+        self.apply_filter()
+        
+    def is_stale(self):
+        """表格內容是否與比賽目前保存的結果不同"""
+        return (self._source is None or self._source[0] is not self.race
+                or self._source[1] != self.race.results_generation)
+        
+    def apply_filter(self):
+        """依篩選條件重新建立檢視"""
+        if self.query is None:
+            self.view = np.empty(0, dtype=np.int64)
+        else:
+            mask = self.query.all()
+            if self.winner_var.get() in self.race.camel_names:
+                mask = mask & self.query.winner(self.winner_var.get())
+                
+            value = self.position_value_entry.get().strip()
+            if self.position_camel_var.get() in self.race.camel_names and value:
+                try:
+                    mask = mask & self.query.position(self.position_camel_var.get(),
+                                                      self.position_op_var.get(), int(value))
+                except ValueError:
+                    self.count_var.set("終點位置必須為整數")
+                    return
+            self.view = np.flatnonzero(mask.to_mask())
+            
+        self.apply_sort()
+        self.offset = 0
+        self.selected_position = None
+        self.refresh()
+        
+    def clear_filter(self):
+        """清除篩選條件"""
+        self.winner_var.set("全部")
+        self.position_camel_var.set("不限")
+        self.position_value_entry.delete(0, tk.END)
+        self.apply_filter()
+        
+    def sort_by(self, column):
+        """依欄位排序（再次點擊同一欄位時反轉順序）"""
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = False
+        self.apply_sort()
+        self.selected_position = None
+        self.refresh()
+        
+    def apply_sort(self):
+        """對目前的檢視排序（穩定排序，同值時保持場次順序）"""
+        if self.sort_column is None or self.columns is None or not len(self.view):
+            return
+            
+        self.view.sort()
+        if self.sort_column == "race":
+            key = self.view
+        elif self.sort_column == "winner":
+            key = self.columns["winners"][self.view]
+        elif self.sort_column == "steps":
+            key = self.columns["steps"][self.view]
+        else:
+            key = self.columns["positions"][self.view, int(self.sort_column.split("_")[1])]
+            
+        order = np.argsort(-key if self.sort_descending else key, kind="stable")
+        self.view = self.view[order]
+        
+    def on_resize(self, event):
+        """表格大小改變時重新計算可見列數"""
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible_rows = max(1, event.height // row_height - 1)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.refresh()
+            
+    def on_scroll(self, action, value, unit=None):
+        """處理捲軸操作"""
+        if action == tk.MOVETO:
+            self.set_offset(int(float(value) * len(self.view)))
+        elif action == tk.SCROLL:
+            step = self.visible_rows if unit == tk.PAGES else 1
+            self.set_offset(self.offset + int(value) * step)
+            
+    def on_mouse_wheel(self, event):
+        """處理滑鼠滾輪"""
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+        return "break"
+        
+    def scroll_rows(self, rows):
+        """捲動指定列數"""
+        self.set_offset(self.offset + rows)
+        return "break"
+        
+    def set_offset(self, offset):
+        """設定可見範圍的起點"""
+        offset = max(0, min(offset, len(self.view) - self.visible_rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+            
+    def move_selection(self, delta):
+        """以鍵盤移動選取列，必要時捲動"""
+        if not len(self.view):
+            return "break"
+        position = 0 if self.selected_position is None else self.selected_position + delta
+        self.selected_position = max(0, min(position, len(self.view) - 1))
+        if self.selected_position < self.offset:
+            self.set_offset(self.selected_position)
+        elif self.selected_position >= self.offset + self.visible_rows:
+            self.set_offset(self.selected_position - self.visible_rows + 1)
+        self.refresh()
+        return "break"
+        
+    def refresh(self):
+        """只填入可見範圍的列（重複使用既有的表格項目）"""
+        self.offset = max(0, min(self.offset, len(self.view) - self.visible_rows))
+        rows = self.view[self.offset:self.offset + self.visible_rows]
+        items = list(self.tree.get_children())
+        
+        # 調整表格項目數量與可見列數相同
+        for item in items[len(rows):]:
+            self.tree.delete(item)
+        while len(items) < len(rows):
+            items.append(self.tree.insert("", tk.END))
+            
+        self._row_races = {}
+        selected = None
+        for i, race_index in enumerate(rows):
+            race_index = int(race_index)
+            values = [race_index + 1,
+                      self.race.camel_names[self.columns["winners"][race_index]],
+                      int(self.columns["steps"][race_index])]
+            values += [int(x) for x in self.columns["positions"][race_index]]
+            self.tree.item(items[i], values=values)
+            self._row_races[items[i]] = race_index
+            if self.offset + i == self.selected_position:
+                selected = items[i]
+                
+        # 選取狀態跟著比賽移動，而不是停在同一個表格項目上
+        self.tree.selection_set([selected] if selected else [])
+        if selected:
+            self.tree.focus(selected)
+        
+        # 更新捲軸與計數
+        total = len(self.view)
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + len(rows)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+        if self.columns is not None:
+            self.count_var.set(f"顯示 {total} / {len(self.columns['winners'])} 場")
+        else:
+            self.count_var.set("尚無逐場結果")
+            
+    def on_select(self, event):
+        """記錄使用者選取的列"""
+        selection = self.tree.selection()
+        if selection and selection[0] in self._row_races:
+            self.selected_position = self.offset + self.tree.index(selection[0])
+            
+    def selected_race(self):
+        """目前選取的比賽索引（未選取時為None）"""
+        if self.selected_position is None or self.selected_position >= len(self.view):
+            return None
+        return int(self.view[self.selected_position])
+        
+    def replay_selected(self):
+        """重播選取的比賽（結果已被新的模擬取代時改為重新載入）"""
+        if self.is_stale():
+            self.load()
+            return
+        race_index = self.selected_race()
+        if race_index is not None and self.on_replay:
+            self.on_replay(race_index)
+
+# 即時預覽類
+class LivePreview:
+    """即時預覽類：編輯配置時以背景執行緒做限時模擬，顯示暫定獲勝率與誤差範圍
+
+    每次編輯立即作廢進行中的模擬，停止編輯一段時間後才開始新的模擬。
+    第一輪只花 PREVIEW_TIME_BUDGET 秒，之後在閒置期間逐輪累積場數、縮小誤差，
+    直到誤差夠小或達到場數上限。
+    """
+    
+    def __init__(self, master, width=500, height=170):
+        """初始化預覽組件"""
+        self.master = master
+        self.width = width
+        self.height = height
+        
+        self.frame = Frame(master, bg="#f0f0f0")
+        self.canvas = Canvas(self.frame, width=width, height=height, bg="white")
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.summary_var = StringVar(value="")
+        Label(self.frame, textvariable=self.summary_var, bg="#f0f0f0", anchor=tk.W).pack(fill=tk.X)
+        
+        # 背景模擬相關：每次編輯都換新的編號，背景執行緒發現編號改變就放棄目前的工作
+        self.generation = 0
+        self._pending = None
+        self._condition = threading.Condition()
+        self._results = queue.Queue()
+        self._debounce_id = None
+        self._poll_id = None
+        self.running = False  # 最新的模擬是否尚未完成
+        self._worker = threading.Thread(target=self._simulate_loop, daemon=True)
+        self._worker.start()
+        
+    def cancel(self):
+        """作廢進行中與尚未開始的模擬"""
+        with self._condition:
+            self.generation += 1
+            self._pending = None
+        self.running = False
+        if self._debounce_id is not None:
+            self.master.after_cancel(self._debounce_id)
+            self._debounce_id = None
+            
+    def request(self, config):
+        """配置已編輯：立即作廢舊的模擬，停止編輯後再以新配置開始模擬（config 為 None 表示輸入不完整）"""
+        self.cancel()
+        if config is None:
+            self.show_message("輸入不完整")
+            return
+            
+        race = CamelRace.from_config(config)
+        valid, error_msg = race.validate_positions()
+        if not valid:
+            self.show_message(f"配置無效: {error_msg}")
+            return
+            
+        self.summary_var.set("等待編輯結束...")
+        self._debounce_id = self.master.after(PREVIEW_DEBOUNCE_MS, self._start, race)
+        
+    def _start(self, race):
+        """交給背景執行緒開始模擬（race 之後只由背景執行緒使用）"""
+        self._debounce_id = None
+        with self._condition:
+            self._pending = (self.generation, race)
+            self._condition.notify()
+        self.running = True
+            
+        if self._poll_id is None:
+            self._poll_id = self.master.after(30, self._poll_results)
+            
+    def _simulate_loop(self):
+        """背景模擬執行緒：每輪限時模擬並回報累積結果，編號改變時立即放棄"""
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                generation, race = self._pending
+                self._pending = None
+                
+            name_index = {name: i for i, name in enumerate(race.camel_names)}
+            wins = np.zeros(race.camel_count, dtype=np.int64)
+            total = 0
+            started = time.perf_counter()
+            try:
+                while generation == self.generation:
+                    deadline = time.perf_counter() + PREVIEW_TIME_BUDGET
+                    while generation == self.generation and time.perf_counter() < deadline:
+                        wins[name_index[race.simulate_one_race(record_history=False)["winner"]]] += 1
+                        total += 1
+                    if generation != self.generation:
+                        break
+                        
+                    rates, errors = self.estimate(wins, total)
+                    done = total >= PREVIEW_MAX_RACES or errors.max() < PREVIEW_TARGET_ERROR
+                    self._results.put((generation, race.camel_names, race.colors, rates, errors,
+                                       total, time.perf_counter() - started, done))
+                    if done:
+                        break
+                    time.sleep(PREVIEW_IDLE_PAUSE)
+            except Exception as e:
+                print(f"即時預覽錯誤: {str(e)}")
+                self._results.put((generation, None))
+                
+    @staticmethod
+    def estimate(wins, total):
+        """由獲勝場數計算獲勝率與95%誤差範圍（百分比）"""
+        p = wins / max(total, 1)
+        return p * 100, PREVIEW_Z * np.sqrt(p * (1 - p) / max(total, 1)) * 100
+        
+    def _poll_results(self):
+        """在介面執行緒取回最新的預覽結果並繪製"""
+        self._poll_id = None
+        latest = None
+        while True:
+            try:
+                latest = self._results.get_nowait()
+            except queue.Empty:
+                break
+                
+        # 只顯示最新模擬的結果，作廢的結果直接捨棄
+        if latest is not None and latest[0] == self.generation:
+            if latest[1] is None:
+                self.show_message("即時預覽失敗")
+                self.running = False
+            else:
+                _, camel_names, colors, rates, errors, total, elapsed, finished = latest
+                self.draw(camel_names, colors, rates, errors)
+                state = "已收斂" if finished else "精煉中..."
+                self.summary_var.set(f"{total} 場，耗時 {elapsed:.2f} 秒，誤差範圍為95%信賴區間（{state}）")
+                self.running = not finished
+                
+        if self.running:
+            self._poll_id = self.master.after(30, self._poll_results)
+            
+    def draw(self, camel_names, colors, rates, errors):
+        """繪製暫定獲勝率長條與誤差範圍"""
+        self.canvas.delete("all")
+        width = max(self.canvas.winfo_width(), self.width)
+        height = max(self.canvas.winfo_height(), self.height)
+        left, right = 60, width - 110
+        row_height = height / max(len(camel_names), 1)
+        scale = (right - left) / 100
+        
+        for i, name in enumerate(camel_names):
+            top = i * row_height
+            middle = top + row_height / 2
+            color = colors[i] if i < len(colors) else "#000000"
+            self.canvas.create_text(left - 10, middle, text=f"駱駝{name}", anchor=tk.E)
+            self.canvas.create_rectangle(left, top + row_height * 0.2, left + rates[i] * scale,
+                                         top + row_height * 0.8, fill=color, outline="")
+            
+            # 誤差範圍
+            low = left + max(rates[i] - errors[i], 0) * scale
+            high = left + min(rates[i] + errors[i], 100) * scale
+            cap = row_height * 0.15
+            self.canvas.create_line(low, middle, high, middle, width=2)
+            self.canvas.create_line(low, middle - cap, low, middle + cap, width=2)
+            self.canvas.create_line(high, middle - cap, high, middle + cap, width=2)
+            self.canvas.create_text(right + 10, middle, text=f"{rates[i]:.1f}% ± {errors[i]:.1f}",
+                                    anchor=tk.W)
+            
+    def show_message(self, message):
+        """清除圖表並顯示訊息"""
+        self.canvas.delete("all")
+        self.summary_var.set(message)
 
 class CamelRaceAdvancedGUI:
     """主GUI介面類"""
     
-    def __init__(self, root):
-        """初始化主介面"""
+    def __init__(self, root, lazy_pages=True):
+        """初始化主介面（lazy_pages 為 True 時賽道與統計頁在第一次切換時才建立）"""
         self.root = root
         self.root.title("駱駝競速高級模擬器")
         self.root.geometry("1200x800")
@@ -553,6 +813,18 @@ class CamelRaceAdvancedGUI:
         # 初始化比賽類
         self.race = CamelRace()
         
+        # 延遲建立的頁面
+        self.lazy_pages = lazy_pages
+        self.track_visualizer = None
+        self.result_visualizer = None
+        self.result_browser = None
+        self.live_preview = None
+        self.startup_time = None
+        
+        # 進行中的可續跑模擬
+        self.active_run = None
+        self.closing = False
+        
         # 設定字體
         self.title_font = font.Font(family="微軟正黑體", size=16, weight="bold")
         self.content_font = font.Font(family="微軟正黑體", size=12)
@@ -565,6 +837,21 @@ class CamelRaceAdvancedGUI:
         
         # 更新界面
         self.update_track_view()
+        
+        # 關閉視窗時先保存進行中的可續跑模擬
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # 第一個畫面顯示後回報啟動時間
+        self.root.after_idle(self.report_startup_time)
+    
+    def report_startup_time(self):
+        """回報從匯入模組到第一個畫面的時間"""
+        self.startup_time = time.perf_counter() - IMPORT_STARTED_AT
+        status = f"就緒（啟動耗時 {self.startup_time:.2f} 秒）"
+        run = self.pending_checkpoint()
+        if run is not None:
+            status += f"，有未完成的可續跑模擬（{run.completed}/{run.count}），勾選「可續跑」後執行多次模擬即可繼續"
+        self.status_var.set(status)
     
     def create_menu(self):
         """創建菜單欄"""
@@ -614,12 +901,50 @@ class CamelRaceAdvancedGUI:
         # 賽道視圖頁
         self.track_frame = Frame(self.notebook, bg="#f0f0f0")
         self.notebook.add(self.track_frame, text="賽道視圖")
-        self.create_track_page()
         
         # 統計分析頁
         self.stats_frame = Frame(self.notebook, bg="#f0f0f0")
         self.notebook.add(self.stats_frame, text="統計分析")
-        self.create_stats_page()
+        
+        # 逐場結果頁
+        self.browser_frame = Frame(self.notebook, bg="#f0f0f0")
+        self.notebook.add(self.browser_frame, text="逐場結果")
+        
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        if not self.lazy_pages:
+            self.ensure_track_page()
+            self.ensure_stats_page()
+            self.ensure_browser_page()
+    
+    def on_tab_changed(self, event):
+        """切換標籤頁時建立尚未建立的頁面"""
+        selected = self.notebook.select()
+        if selected == str(self.track_frame):
+            self.ensure_track_page()
+        elif selected == str(self.stats_frame):
+            self.ensure_stats_page()
+        elif selected == str(self.browser_frame):
+            self.ensure_browser_page().load()
+    
+    def ensure_track_page(self):
+        """確保賽道視圖頁已建立"""
+        if self.track_visualizer is None:
+            self.create_track_page()
+            self.track_visualizer.update()
+        return self.track_visualizer
+    
+    def ensure_stats_page(self):
+        """確保統計分析頁已建立"""
+        if self.result_visualizer is None:
+            self.create_stats_page()
+        return self.result_visualizer
+    
+    def ensure_browser_page(self):
+        """確保逐場結果頁已建立"""
+        if self.result_browser is None:
+            self.result_browser = ResultBrowser(self.browser_frame, self.race, self.replay_race)
+            self.result_browser.frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        return self.result_browser
     
     def create_config_page(self):
         """創建配置頁面"""
@@ -648,6 +973,21 @@ class CamelRaceAdvancedGUI:
         sim_menu = OptionMenu(sim_frame, self.sim_count_var, *sim_options)
         sim_menu.pack(side=tk.LEFT, padx=10)
         
+        # 可續跑：每個分塊寫入檢查點，關閉視窗後下次可從中斷處繼續
+        self.checkpoint_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(sim_frame, text="可續跑（寫入檢查點）", variable=self.checkpoint_var,
+                       font=self.content_font, bg="#f0f0f0").pack(side=tk.LEFT, padx=10)
+        
+        # 記憶體上限設置
+        memory_frame = Frame(general_frame, bg="#f0f0f0")
+        memory_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        Label(memory_frame, text="記憶體上限(MB):", font=self.content_font, bg="#f0f0f0").pack(side=tk.LEFT)
+        self.memory_budget_var = StringVar(value=str(DEFAULT_MEMORY_BUDGET_MB))
+        memory_options = ["不限制", "256", "512", "1024", "2048", "4096"]
+        memory_menu = OptionMenu(memory_frame, self.memory_budget_var, *memory_options)
+        memory_menu.pack(side=tk.LEFT, padx=10)
+        
         # 駱駝位置設置
         positions_frame = ttk.LabelFrame(self.config_frame, text="駱駝位置設定")
         positions_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -671,6 +1011,16 @@ class CamelRaceAdvancedGUI:
         
         self.update_camel_entries()
         
+        # 即時預覽區域
+        preview_frame = ttk.LabelFrame(self.config_frame, text="即時預覽")
+        preview_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        self.live_preview_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(preview_frame, text="編輯時自動預覽獲勝率", variable=self.live_preview_var,
+                       command=self.schedule_preview, font=self.content_font, bg="#f0f0f0").pack(anchor=tk.W, padx=10)
+        self.live_preview = LivePreview(preview_frame)
+        self.live_preview.frame.pack(fill=tk.X, padx=10, pady=5)
+        
         # 按鈕區域
         button_frame = Frame(self.config_frame, bg="#f0f0f0")
         button_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -760,11 +1110,13 @@ class CamelRaceAdvancedGUI:
             x_entry = Entry(self.positions_entries_frame, width=10, font=self.content_font)
             x_entry.insert(0, str(self.race.x_positions[i]))
             x_entry.grid(row=i, column=1, padx=5, pady=2)
+            x_entry.bind("<KeyRelease>", lambda event: self.schedule_preview())
             self.x_entries.append(x_entry)
             
             y_entry = Entry(self.positions_entries_frame, width=10, font=self.content_font)
             y_entry.insert(0, str(self.race.y_positions[i]))
             y_entry.grid(row=i, column=2, padx=5, pady=2)
+            y_entry.bind("<KeyRelease>", lambda event: self.schedule_preview())
             self.y_entries.append(y_entry)
             
             color_button = Button(self.positions_entries_frame, bg=self.race.colors[i], width=5,
@@ -784,6 +1136,10 @@ class CamelRaceAdvancedGUI:
                 y = int(self.y_entries[i].get())
                 self.race.set_position(i, x, y)
                 
+            # 更新記憶體上限
+            memory_budget = self.memory_budget_var.get()
+            self.race.memory_budget = None if memory_budget == "不限制" else int(memory_budget) * 1024 * 1024
+                
             return True
         except:
             self.status_var.set("配置更新失敗: 請檢查輸入")
@@ -819,16 +1175,45 @@ class CamelRaceAdvancedGUI:
     def update_track_view(self):
         """更新賽道視圖"""
         self.apply_config()
-        self.track_visualizer.update()
+        if self.track_visualizer is not None:
+            self.track_visualizer.update()
+        self.schedule_preview()
+    
+    def preview_config(self):
+        """由輸入欄位取得預覽用的配置（不修改目前的比賽，輸入不完整時回傳 None）"""
+        try:
+            x_positions = [int(entry.get()) for entry in self.x_entries]
+            y_positions = [int(entry.get()) for entry in self.y_entries]
+        except ValueError:
+            return None
+            
+        config = self.race.to_config()
+        config.update(track_length=self.track_length_var.get(), x_positions=x_positions, y_positions=y_positions)
+        return config
+    
+    def schedule_preview(self):
+        """配置編輯後更新即時預覽（舊的預覽模擬立即作廢）"""
+        if self.live_preview is None:
+            return
+        if not self.live_preview_var.get():
+            self.live_preview.cancel()
+            self.live_preview.show_message("即時預覽已關閉")
+            return
+        self.live_preview.request(self.preview_config())
+    
+    def pause_preview(self):
+        """完整模擬期間暫停即時預覽，避免搶占運算資源（下次編輯配置時由 schedule_preview 恢復）"""
+        self.live_preview.cancel()
+        self.live_preview.show_message("執行完整模擬中，編輯配置後恢復預覽")
     
     def update_stats_view(self):
-        """更新統計視圖"""
-        if not self.race.results:
+        """更新統計視圖（僅保留統計數據時仍可繪製）"""
+        analysis = self.race.analyze_results()
+        if analysis is None:
             self.status_var.set("尚無模擬結果可供分析")
             return
             
-        analysis = self.race.analyze_results()
-        self.result_visualizer.plot_results(analysis)
+        self.ensure_stats_page().plot_results(analysis)
     
     def run_single_simulation(self):
         """運行單次模擬"""
@@ -839,12 +1224,15 @@ class CamelRaceAdvancedGUI:
         self.root.update()
         
         result = self.race.simulate_one_race()
-        self.race.results = [result]
+        self.race.replace_results([result])
         self.race.winning_stats = {name: 0 for name in self.race.camel_names}
+        self.race.stats = None
         self.race.winning_stats[result["winner"]] += 1
         
         # 顯示結果
-        self.track_visualizer.update(result["final_positions"])
+        self.ensure_track_page().update(result["final_positions"])
+        if self.result_browser is not None and self.notebook.select() == str(self.browser_frame):
+            self.result_browser.load()
         self.status_var.set(f"模擬完成! 獲勝者: 駱駝{result['winner']}")
         
         # 儲存歷史以供動畫使用
@@ -852,9 +1240,15 @@ class CamelRaceAdvancedGUI:
     
     def run_multi_simulation(self):
         """運行多次模擬"""
+        if self.checkpoint_var.get():
+            self.run_checkpointed_simulation()
+            return
+            
         if not self.validate_config():
             return
             
+        self.pause_preview()
+        
         sim_count = self.sim_count_var.get()
         self.status_var.set(f"執行{sim_count}次模擬...")
         self.progress_var.set(0)
@@ -876,14 +1270,105 @@ class CamelRaceAdvancedGUI:
         # 更新狀態
         winner = analysis["ranking"][0][0]
         win_rate = analysis["ranking"][0][1]
-        self.status_var.set(f"模擬完成! 獲勝率最高: 駱駝{winner} ({win_rate:.2f}%)")
+        status = f"模擬完成! 獲勝率最高: 駱駝{winner} ({win_rate:.2f}%)"
+        if self.race.retention != RETENTION_FULL:
+            status += f"（受記憶體上限限制，結果僅保留: {RETENTION_LABELS[self.race.retention]}）"
+        self.status_var.set(status)
+    
+    def pending_checkpoint(self):
+        """回傳未完成的可續跑模擬（沒有時回傳 None）"""
+        from camel_race_checkpoint import CheckpointedRun, MANIFEST_FILE
+        
+        if not os.path.exists(os.path.join(GUI_CHECKPOINT_DIR, MANIFEST_FILE)):
+            return None
+        try:
+            run = CheckpointedRun.load(GUI_CHECKPOINT_DIR)
+        except (OSError, ValueError, KeyError):
+            return None
+        return None if run.finished else run
+    
+    def run_checkpointed_simulation(self):
+        """以檢查點執行多次模擬，停止或關閉視窗後可從最後一個完整分塊繼續"""
+        from camel_race_checkpoint import CheckpointedRun
+        
+        run = self.pending_checkpoint()
+        if run is not None and messagebox.askyesno(
+                "繼續未完成的模擬",
+                f"上次的可續跑模擬已完成 {run.completed}/{run.count} 場，是否繼續？\n"
+                "繼續時沿用該次的配置；選擇「否」將捨棄並以目前配置重新開始。"):
+            # 續跑沿用檢查點的配置，介面同步顯示
+            self.race.apply_config(run.manifest["config"])
+            self.track_length_var.set(self.race.track_length)
+            self.update_camel_entries()
+            self.update_track_view()
+        else:
+            if not self.validate_config():
+                return
+            shutil.rmtree(GUI_CHECKPOINT_DIR, ignore_errors=True)
+            run = CheckpointedRun.create(self.race, self.sim_count_var.get(), GUI_CHECKPOINT_DIR,
+                                         chunk_size=GUI_CHECKPOINT_CHUNK_SIZE)
+        
+        self.pause_preview()
+        
+        self.status_var.set(f"執行可續跑模擬... {run.completed}/{run.count}")
+        self.progress_var.set((run.completed / run.count) * 100)
+        self.root.update()
+        
+        def update_progress(current, total):
+            progress = (current / total) * 100
+            self.progress_var.set(progress)
+            self.status_var.set(f"執行可續跑模擬... {current}/{total}")
+            self.root.update()
+        
+        # 每個分塊完成後才檢查停止要求，已完成的分塊都已寫入檢查點
+        self.active_run = run
+        try:
+            analysis = run.run(update_progress)
+        finally:
+            self.active_run = None
+        
+        if self.closing:
+            self.root.destroy()
+            return
+        if not run.finished:
+            self.status_var.set(f"模擬已停止（{run.completed}/{run.count}），再次執行多次模擬即可繼續")
+            return
+        
+        # 檢查點只保存精簡結果，介面僅保留統計數據
+        self.race.replace_results([])
+        self.race.stats = run.stats
+        self.race.winning_stats = dict(run.stats.win_counts)
+        self.race.retention = RETENTION_AGGREGATE
+        self.race.current_simulation = run.count
+        self.race.last_engine = "checkpoint"
+        self.race.requested_races = run.count
+        
+        # 更新統計視圖
+        self.notebook.select(self.stats_frame)
+        self.update_stats_view()
+        
+        winner = analysis["ranking"][0][0]
+        win_rate = analysis["ranking"][0][1]
+        self.status_var.set(f"模擬完成! 獲勝率最高: 駱駝{winner} ({win_rate:.2f}%)（結果保存於 {GUI_CHECKPOINT_DIR}）")
     
     def stop_simulation(self):
         """停止模擬"""
-        # 這裡應該有個機制來停止模擬過程
-        # 由於我們的模擬是阻塞式的，實際上無法中途停止
-        # 在實際應用中，應該使用線程來實現
-        pass
+        # 一般的多次模擬是阻塞式的，無法中途停止；
+        # 可續跑模擬在目前分塊完成後停止，進度保留在檢查點
+        if self.active_run is None:
+            self.status_var.set("只有可續跑模擬可以中途停止")
+            return
+        self.active_run.stop()
+        self.status_var.set("將在目前分塊完成後停止...")
+    
+    def on_close(self):
+        """關閉視窗（可續跑模擬進行中時，等目前分塊寫入檢查點後才關閉）"""
+        if self.active_run is not None:
+            self.closing = True
+            self.active_run.stop()
+            self.status_var.set("正在保存檢查點，完成後關閉...")
+            return
+        self.root.destroy()
     
     def play_animation(self):
         """播放比賽動畫"""
@@ -891,17 +1376,36 @@ class CamelRaceAdvancedGUI:
             self.status_var.set("沒有可用的比賽記錄")
             return
             
-        self.track_visualizer.animate_race(self.last_race_history)
+        self.ensure_track_page().animate_race(self.last_race_history)
         self.status_var.set("正在播放比賽動畫...")
     
+    def replay_race(self, race_index):
+        """在賽道視圖重播指定的比賽"""
+        result = self.race.results[race_index]
+        self.notebook.select(self.track_frame)
+        track_visualizer = self.ensure_track_page()
+        
+        if "history" in result:
+            self.last_race_history = result["history"]
+            track_visualizer.animate_race(self.last_race_history)
+            self.status_var.set(f"正在重播第 {race_index + 1} 場比賽...")
+        else:
+            # 受記憶體上限限制時只保留終點位置
+            track_visualizer.stop_animation()
+            track_visualizer.update(result["final_positions"])
+            self.status_var.set(f"第 {race_index + 1} 場未保存比賽過程，僅顯示終點位置")
+    
     def stop_animation(self):
         """停止動畫"""
-        self.track_visualizer.stop_animation()
+        if self.track_visualizer is not None:
+            self.track_visualizer.stop_animation()
         self.status_var.set("動畫已停止")
     
     def reset_configuration(self):
         """重置配置"""
         self.race = CamelRace()
+        if self.result_browser is not None:
+            self.result_browser.race = self.race
         self.track_length_var.set(self.race.track_length)
         self.update_camel_entries()
         self.update_track_view()
@@ -945,8 +1449,8 @@ class CamelRaceAdvancedGUI:
             self.status_var.set(f"儲存配置失敗")
     
     def export_excel(self):
-        """匯出Excel結果"""
-        if not self.race.results:
+        """匯出Excel結果（只保留統計數據時僅匯出摘要）"""
+        if not self.race.results and (self.race.stats is None or not self.race.stats.total_races):
             self.status_var.set("沒有可匯出的模擬結果")
             messagebox.showwarning("匯出失敗", "沒有可匯出的模擬結果，請先執行模擬。")
             return
@@ -1004,7 +1508,7 @@ def main():
     """主程式入口"""
     try:
         root = tk.Tk()
-        app = CamelRaceAdvancedGUI(root)
+        app = CamelRaceAdvancedGUI(root, lazy_pages="--eager-pages" not in sys.argv)
         root.mainloop()
     except Exception as e:
         print(f"程式執行錯誤: {str(e)}")
@@ -0,0 +1,248 @@
+import os
+import json
+import struct
+
+# 比賽歷史封存檔格式
+#
+#   檔頭:   MAGIC(4) 版本(u8)
+#   紀錄:   駱駝數(u8) 賽道長度(u8) 移動次數(u16) 中繼資料長度(u16) 中繼資料(JSON)
+#           起始狀態: 每隻駱駝 x(u8) y(u8)
+#           每次移動: 移動者與步數(u8，高4位元為移動者、低4位元為步數)
+#                     被帶動的駱駝位元遮罩  y座標未重新校正的駱駝位元遮罩
+#   索引:   紀錄數(u32) 每筆紀錄的 位移(u64) 長度(u32)
+#   檔尾:   索引位移(u64) INDEX_MAGIC(4)
+#
+# simulate_one_race 依駱駝在列表中的順序校正y座標，排在移動者之後的駱駝會沿用
+# 原本的高度，因此另外記錄這些駱駝，確保解碼結果與原始歷史完全相同。
+# 每次移動只需 1 + 2*ceil(駱駝數/8) 位元組，解碼時依序重建每一步的完整狀態。
+MAGIC = b"CRHA"
+INDEX_MAGIC = b"CRHI"
+VERSION = 1
+HEADER = struct.Struct("<4sB")
+RECORD_HEADER = struct.Struct("<BBHH")
+INDEX_ENTRY = struct.Struct("<QI")
+FOOTER = struct.Struct("<Q4s")
+MAX_CAMELS = 16
+MAX_DICE = 15
+MAX_TRACK_LENGTH = 255
+
+def _camel_names(camel_count):
+    """依駱駝數量產生名稱 A, B, C, ..."""
+    return [chr(65 + i) for i in range(camel_count)]
+
+def _mask_bytes(camel_count):
+    """位元遮罩所需的位元組數"""
+    return (camel_count + 7) // 8
+
+def _positions_by_name(state):
+    """將一個狀態轉換為 {名稱: (x, y)}"""
+    return {name: (x, y) for name, x, y in state}
+
+def encode_history(history, track_length, metadata=None):
+    """將 race_history（狀態列表）編碼為差分二進位紀錄"""
+    if not 1 <= track_length <= MAX_TRACK_LENGTH:
+        raise ValueError(f"賽道長度必須介於1到{MAX_TRACK_LENGTH}之間")
+    initial = _positions_by_name(history[0])
+    names = sorted(initial)
+    camel_count = len(names)
+    if camel_count > MAX_CAMELS:
+        raise ValueError(f"封存格式最多支援{MAX_CAMELS}隻駱駝")
+    if names != _camel_names(camel_count):
+        raise ValueError("駱駝名稱必須為 A, B, C, ...")
+
+    mask_bytes = _mask_bytes(camel_count)
+    meta = json.dumps(metadata or {}, ensure_ascii=False).encode("utf-8")
+
+    data = bytearray(RECORD_HEADER.pack(camel_count, track_length, len(history) - 1, len(meta)))
+    data += meta
+    for name in names:
+        x, y = initial[name]
+        data += bytes((x, y))
+
+    previous = initial
+    for state in history[1:]:
+        current = _positions_by_name(state)
+
+        # 找出這一步被帶動的駱駝；其中原本最底層者即為移動者
+        moved = [i for i, name in enumerate(names) if current[name][0] != previous[name][0]]
+        if not moved:
+            raise ValueError("歷史中有未移動任何駱駝的步驟")
+        mover = min(moved, key=lambda i: previous[names[i]][1])
+        dice = current[names[mover]][0] - previous[names[mover]][0]
+        if not 0 < dice <= MAX_DICE:
+            raise ValueError(f"步數超出封存格式範圍: {dice}")
+
+        # 目的地原有的駱駝數，用於判斷每隻被帶動駱駝的y座標是否經過校正
+        new_x = current[names[mover]][0]
+        stacked = sum(1 for i, name in enumerate(names) if i not in moved and previous[name][0] == new_x)
+        base_y = previous[names[mover]][1]
+
+        mask = 0
+        kept_mask = 0
+        for i in moved:
+            mask |= 1 << i
+            old_y, new_y = previous[names[i]][1], current[names[i]][1]
+            if new_y == old_y - base_y + 1 + stacked:
+                continue
+            if new_y != old_y:
+                raise ValueError("歷史中有無法編碼的y座標變化")
+            kept_mask |= 1 << i
+
+        data.append((mover << 4) | dice)
+        data += mask.to_bytes(mask_bytes, "little")
+        data += kept_mask.to_bytes(mask_bytes, "little")
+        previous = current
+
+    return bytes(data)
+
+def decode_metadata(data):
+    """只解碼紀錄標頭與中繼資料（不還原狀態），data 只需包含紀錄開頭的部分"""
+    _, track_length, _, meta_length = RECORD_HEADER.unpack_from(data, 0)
+    offset = RECORD_HEADER.size
+    metadata = json.loads(data[offset:offset + meta_length].decode("utf-8"))
+    metadata.setdefault("track_length", track_length)
+    return metadata
+
+def decode_history(data):
+    """將差分紀錄解碼為 (狀態列表, 中繼資料)，狀態格式與 TrackVisualizer.animate_race 相同"""
+    camel_count, _, move_count, meta_length = RECORD_HEADER.unpack_from(data, 0)
+    metadata = decode_metadata(data)
+    offset = RECORD_HEADER.size + meta_length
+
+    names = _camel_names(camel_count)
+    xs = list(data[offset:offset + 2 * camel_count:2])
+    ys = list(data[offset + 1:offset + 2 * camel_count:2])
+    offset += 2 * camel_count
+
+    mask_bytes = _mask_bytes(camel_count)
+    history = [[[names[i], xs[i], ys[i]] for i in range(camel_count)]]
+
+    for _ in range(move_count):
+        mover, dice = data[offset] >> 4, data[offset] & 0x0F
+        mask = int.from_bytes(data[offset + 1:offset + 1 + mask_bytes], "little")
+        kept_mask = int.from_bytes(data[offset + 1 + mask_bytes:offset + 1 + 2 * mask_bytes], "little")
+        offset += 1 + 2 * mask_bytes
+
+        moved = [i for i in range(camel_count) if mask >> i & 1]
+        new_x = xs[mover] + dice
+        base_y = ys[mover]
+
+        # 被帶動的駱駝疊在目的地原有駱駝之上
+        stacked = sum(1 for i in range(camel_count) if not mask >> i & 1 and xs[i] == new_x)
+        for i in moved:
+            xs[i] += dice
+            if not kept_mask >> i & 1:
+                ys[i] = ys[i] - base_y + 1 + stacked
+
+        history.append([[names[i], xs[i], ys[i]] for i in range(camel_count)])
+
+    return history, metadata
+
+class HistoryArchiveWriter:
+    """比賽歷史封存檔寫入器（可附加到既有檔案）"""
+
+    def __init__(self, filename):
+        """開啟或建立封存檔"""
+        self.filename = filename
+        self.index = []
+
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            with open(filename, 'rb') as f:
+                self.index, index_offset = _read_index(f)
+            self.file = open(filename, 'r+b')
+            # 從舊索引的位置開始覆寫，關閉時再寫回新的索引
+            self.file.seek(index_offset)
+            self.file.truncate()
+        else:
+            self.file = open(filename, 'wb')
+            self.file.write(HEADER.pack(MAGIC, VERSION))
+
+    def append(self, history, track_length, metadata=None):
+        """附加一場比賽的歷史，回傳其在封存檔中的編號"""
+        data = encode_history(history, track_length, metadata)
+        self.index.append((self.file.tell(), len(data)))
+        self.file.write(data)
+        return len(self.index) - 1
+
+    def append_result(self, race_result, track_length, metadata=None):
+        """附加一場 simulate_one_race 的結果（需包含 history）"""
+        metadata = dict(metadata or {}, winner=race_result["winner"], steps=race_result["steps"])
+        return self.append(race_result["history"], track_length, metadata)
+
+    def close(self):
+        """寫入索引與檔尾並關閉檔案"""
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(struct.pack("<I", len(self.index)))
+        for offset, length in self.index:
+            self.file.write(INDEX_ENTRY.pack(offset, length))
+        self.file.write(FOOTER.pack(index_offset, INDEX_MAGIC))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def _read_index(f):
+    """讀取封存檔的索引，回傳 (索引列表, 索引位移)"""
+    magic, version = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError("不是比賽歷史封存檔")
+    if version != VERSION:
+        raise ValueError(f"不支援的封存檔版本: {version}")
+
+    f.seek(-FOOTER.size, os.SEEK_END)
+    index_offset, index_magic = FOOTER.unpack(f.read(FOOTER.size))
+    if index_magic != INDEX_MAGIC:
+        raise ValueError("封存檔索引損壞或未正常關閉")
+
+    f.seek(index_offset)
+    count, = struct.unpack("<I", f.read(4))
+    raw = f.read(count * INDEX_ENTRY.size)
+    index = [INDEX_ENTRY.unpack_from(raw, i * INDEX_ENTRY.size) for i in range(count)]
+    return index, index_offset
+
+class HistoryArchiveReader:
+    """比賽歷史封存檔讀取器，可依編號隨機讀取任一場比賽"""
+
+    def __init__(self, filename):
+        """開啟封存檔並載入索引"""
+        self.file = open(filename, 'rb')
+        self.index, _ = _read_index(self.file)
+
+    def __len__(self):
+        return len(self.index)
+
+    def read_record(self, number):
+        """讀取第 number 場比賽，回傳 (狀態列表, 中繼資料)"""
+        offset, length = self.index[number]
+        self.file.seek(offset)
+        return decode_history(self.file.read(length))
+
+    def read_metadata(self, number):
+        """只讀取第 number 場比賽的中繼資料（含賽道長度），不解碼狀態"""
+        offset, _ = self.index[number]
+        self.file.seek(offset)
+        header = self.file.read(RECORD_HEADER.size)
+        _, _, _, meta_length = RECORD_HEADER.unpack(header)
+        return decode_metadata(header + self.file.read(meta_length))
+
+    def read(self, number):
+        """讀取第 number 場比賽的狀態列表（可直接交給 TrackVisualizer.animate_race）"""
+        return self.read_record(number)[0]
+
+    def __iter__(self):
+        for number in range(len(self)):
+            yield self.read_record(number)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
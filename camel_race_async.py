@@ -0,0 +1,80 @@
+import asyncio
+import weakref
+
+from camel_race_core import RaceStats, DEFAULT_SIMULATION_COUNT, simulate_shard
+
+# 非同步模擬預設參數
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_MAX_CONCURRENT = 4
+
+def _check_counts(count, batch_size):
+    """檢查模擬次數與批次大小，無效時拋出 ValueError"""
+    if count < 1:
+        raise ValueError("模擬次數必須至少為1")
+    if batch_size < 1:
+        raise ValueError("批次大小必須至少為1")
+
+def _partial_result(stats, total):
+    """將目前累計的統計轉換為部分結果"""
+    analysis = stats.to_analysis()
+    analysis["win_counts"] = dict(stats.win_counts)
+    analysis["completed"] = stats.total_races
+    analysis["total"] = total
+    analysis["finished"] = stats.total_races >= total
+    return analysis
+
+class AsyncSimulator:
+    """asyncio 模擬器：在執行器中分批模擬，並限制同時執行的批次數"""
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT, executor=None):
+        """初始化模擬器（executor 為 None 時使用事件迴圈預設的執行緒池）"""
+        self.max_concurrent = max_concurrent
+        self.executor = executor
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _get_semaphore(self):
+        """取得目前事件迴圈的信號量（每個事件迴圈各自一個）"""
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphores[loop]
+
+    async def simulate(self, race, count=DEFAULT_SIMULATION_COUNT, batch_size=DEFAULT_BATCH_SIZE):
+        """非同步執行多次模擬，每完成一批就產出一次部分統計"""
+        _check_counts(count, batch_size)
+        loop = asyncio.get_running_loop()
+        semaphore = self._get_semaphore()
+        config = race.to_config()
+        stats = RaceStats(race.camel_names)
+
+        while stats.total_races < count:
+            batch_count = min(batch_size, count - stats.total_races)
+
+            # 每一批都重新排隊取得執行權，讓多個請求輪流使用執行器
+            async with semaphore:
+                batch = await loop.run_in_executor(self.executor, simulate_shard,
+                                                   config, batch_count)
+
+            stats.merge(RaceStats.from_dict(batch))
+            yield _partial_result(stats, count)
+
+    async def run(self, race, count=DEFAULT_SIMULATION_COUNT, batch_size=DEFAULT_BATCH_SIZE):
+        """非同步執行多次模擬，只回傳最終結果"""
+        result = None
+        async for result in self.simulate(race, count, batch_size):
+            pass
+        return result
+
+# 預設模擬器
+_default_simulator = AsyncSimulator()
+
+def simulate_races_async(race, count=DEFAULT_SIMULATION_COUNT, batch_size=DEFAULT_BATCH_SIZE,
+                         simulator=None):
+    """simulate_races 的非同步版本，回傳部分統計的非同步迭代器
+
+    取消外層任務時會立即停止等待，執行中的批次在背景完成後直接捨棄，不會再送出新的批次。
+    """
+    # 在建立非同步迭代器前檢查，讓呼叫端立即得到錯誤
+    _check_counts(count, batch_size)
+    simulator = simulator or _default_simulator
+    return simulator.simulate(race, count, batch_size)
@@ -0,0 +1,175 @@
+import csv
+
+import numpy as np
+
+from camel_race_core import collect_race_columns
+
+# 下注類型
+BET_WIN = "win"  # 獲勝
+BET_TOP2 = "top2"  # 前兩名
+BET_PLACE = "place"  # 指定名次（rank 欄位，1 為第一名）
+BET_LAST = "last"  # 最後一名
+BET_AHEAD = "ahead"  # 名次在對手之前
+BET_TYPES = (BET_WIN, BET_TOP2, BET_PLACE, BET_LAST, BET_AHEAD)
+
+DEFAULT_CHUNK_SIZE = 65536
+
+def finishing_ranks(winners, positions, heights):
+    """計算每場比賽每隻駱駝的名次（0 為第一名）
+
+    第一名與模擬回報的獲勝者一致，其餘依終點x座標、同格時依堆疊高度排序。
+    """
+    key = positions.astype(np.int64) * 256 + heights
+    key[np.arange(len(winners)), winners] = np.iinfo(np.int64).max
+    order = np.argsort(-key, axis=1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(order.shape[1])[None, :], axis=1)
+    return ranks
+
+def load_bets(filename):
+    """從CSV檔載入下注定義（欄位: name,type,camel,rival,rank,payout,stake）"""
+    bets = []
+    with open(filename, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            bet = {key: value for key, value in row.items() if value not in (None, "")}
+            for key in ("payout", "stake"):
+                if key in bet:
+                    bet[key] = float(bet[key])
+            if "rank" in bet:
+                bet["rank"] = int(bet["rank"])
+            bets.append(bet)
+    return bets
+
+class BetEvaluator:
+    """下注期望值評估器
+
+    每筆下注定義為字典：
+        type   - win / top2 / place / last / ahead
+        camel  - 下注的駱駝
+        rival  - ahead 類型的對手
+        rank   - place 類型的名次（1 為第一名）
+        payout - 命中時的淨收益（每單位本金）
+        stake  - 未命中時損失的本金（預設 1）
+    所有下注都可由兩個充分統計量求得：每隻駱駝各名次的場數，以及每對駱駝
+    「名次在前」的場數。兩者在一次向量化掃描結果陣列時算出並快取，之後每筆
+    下注只需查表，因此同一組結果可以快速評估並排序數百筆下注。
+    """
+
+    def __init__(self, camel_names, winners, positions, heights):
+        """由欄位陣列建立評估器"""
+        self.camel_names = list(camel_names)
+        self.name_index = {name: i for i, name in enumerate(self.camel_names)}
+        self.winners = np.asarray(winners, dtype=np.int64)
+        self.positions = np.asarray(positions, dtype=np.int64)
+        self.heights = np.asarray(heights, dtype=np.int64)
+        self.size = len(self.winners)
+        self._rank_counts = None
+        self._ahead_counts = None
+
+    @classmethod
+    def from_race(cls, race, races=None):
+        """由 CamelRace 的保存結果（或傳入的串流）建立評估器"""
+        if races is None:
+            if not race.results:
+                raise ValueError("沒有逐場結果可供評估")
+            races = race.results
+        columns = collect_race_columns(races, race.camel_names)
+        return cls(race.camel_names, columns["winners"], columns["positions"], columns["heights"])
+
+    def _compile(self, bets):
+        """將下注定義轉換為向量化條件陣列"""
+        n = len(self.camel_names)
+        count = len(bets)
+        camels = np.zeros(count, dtype=np.int64)
+        rivals = np.zeros(count, dtype=np.int64)
+        low = np.zeros(count, dtype=np.int64)
+        high = np.zeros(count, dtype=np.int64)
+        is_ahead = np.zeros(count, dtype=bool)
+
+        for i, bet in enumerate(bets):
+            bet_type = bet.get("type")
+            if bet_type not in BET_TYPES:
+                raise ValueError(f"不支援的下注類型: {bet_type}")
+            if bet.get("camel") not in self.name_index:
+                raise ValueError(f"找不到駱駝: {bet.get('camel')}")
+            camels[i] = self.name_index[bet["camel"]]
+
+            if bet_type == BET_WIN:
+                low[i], high[i] = 0, 0
+            elif bet_type == BET_TOP2:
+                low[i], high[i] = 0, 1
+            elif bet_type == BET_LAST:
+                low[i], high[i] = n - 1, n - 1
+            elif bet_type == BET_PLACE:
+                rank = int(bet.get("rank", 0))
+                if not 1 <= rank <= n:
+                    raise ValueError(f"名次必須介於1到{n}之間")
+                low[i], high[i] = rank - 1, rank - 1
+            else:
+                if bet.get("rival") not in self.name_index:
+                    raise ValueError(f"找不到對手駱駝: {bet.get('rival')}")
+                rivals[i] = self.name_index[bet["rival"]]
+                is_ahead[i] = True
+
+        return camels, rivals, low, high, is_ahead
+
+    def _scan(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """掃描結果陣列，計算名次分佈與兩兩名次比較的場數"""
+        n = len(self.camel_names)
+        rank_counts = np.zeros((n, n), dtype=np.int64)  # [駱駝, 名次] -> 場數
+        ahead_counts = np.zeros((n, n), dtype=np.int64)  # [駱駝, 對手] -> 名次在前的場數
+        rank_values = np.arange(n)
+
+        # 分段處理以限制中間陣列的記憶體用量
+        for start in range(0, self.size, chunk_size):
+            end = start + chunk_size
+            ranks = finishing_ranks(self.winners[start:end], self.positions[start:end],
+                                    self.heights[start:end])
+            rank_counts += (ranks[:, :, None] == rank_values).sum(axis=0)
+            ahead_counts += (ranks[:, :, None] < ranks[:, None, :]).sum(axis=0)
+
+        self._rank_counts = rank_counts
+        self._ahead_counts = ahead_counts
+
+    def hit_counts(self, bets, chunk_size=DEFAULT_CHUNK_SIZE):
+        """計算每筆下注的命中場數"""
+        camels, rivals, low, high, is_ahead = self._compile(bets)
+        if self._rank_counts is None:
+            self._scan(chunk_size)
+
+        # 名次區間的命中數由累積和相減求得
+        cumulative = np.concatenate([np.zeros((len(self.camel_names), 1), dtype=np.int64),
+                                     np.cumsum(self._rank_counts, axis=1)], axis=1)
+        in_range = cumulative[camels, high + 1] - cumulative[camels, low]
+        ahead = self._ahead_counts[camels, rivals]
+        return np.where(is_ahead, ahead, in_range)
+
+    def evaluate(self, bets, chunk_size=DEFAULT_CHUNK_SIZE):
+        """計算每筆下注的命中機率、期望值、變異數與標準誤，依期望值由高到低排序"""
+        if not self.size:
+            raise ValueError("沒有比賽結果可供評估")
+
+        hits = self.hit_counts(bets, chunk_size)
+        p = hits / self.size
+        payout = np.array([float(bet.get("payout", 0.0)) for bet in bets])
+        stake = np.array([float(bet.get("stake", 1.0)) for bet in bets])
+
+        expected = p * payout - (1 - p) * stake
+        variance = p * (1 - p) * (payout + stake) ** 2
+        std_error = np.sqrt(variance / self.size)
+
+        results = []
+        for i, bet in enumerate(bets):
+            results.append(dict(
+                bet,
+                probability=float(p[i]),
+                expected_value=float(expected[i]),
+                variance=float(variance[i]),
+                std_error=float(std_error[i])
+            ))
+        results.sort(key=lambda r: r["expected_value"], reverse=True)
+        return results
+
+def evaluate_bets(race, bets, races=None):
+    """評估一組下注在目前模擬結果下的期望值（依期望值排序）"""
+    return BetEvaluator.from_race(race, races).evaluate(bets)
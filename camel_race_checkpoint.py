@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import random
+import argparse
+
+import numpy as np
+
+from camel_race_core import CamelRace, RaceStats, print_progress, load_race
+
+# 檢查點預設參數
+DEFAULT_CHUNK_SIZE = 100000
+MANIFEST_FILE = "manifest.json"
+CHUNK_FILE = "chunk_{:06d}.npz"
+
+def _atomic_write_json(filename, data):
+    """先寫入暫存檔再取代，避免中斷時留下損壞的檔案"""
+    tmp = filename + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+def _atomic_write_chunk(filename, batch):
+    """以原子方式寫入一個結果分塊"""
+    tmp = filename + ".tmp"
+    with open(tmp, 'wb') as f:
+        np.savez(f, **batch)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+def _rng_state_to_json(state):
+    """將 random.Random 的狀態轉換為可序列化的格式"""
+    version, internal, gauss_next = state
+    return [version, list(internal), gauss_next]
+
+def _rng_state_from_json(data):
+    """還原 random.Random 的狀態"""
+    version, internal, gauss_next = data
+    return (version, tuple(internal), gauss_next)
+
+class CheckpointedRun:
+    """可中斷、可續跑的大量模擬
+
+    每完成一個分塊，就把精簡結果（iter_races 的 NumPy 批次格式）寫入檢查點目錄，
+    並更新 manifest（配置、進度、統計累加器與亂數產生器狀態）。
+    中斷後從最後一個完整分塊繼續，結果與不中斷、相同種子的執行完全一致。
+    """
+
+    def __init__(self, directory):
+        """初始化（需再呼叫 create 或 load）"""
+        self.directory = directory
+        self.manifest = None
+        self.race = None
+        self.stats = None
+        self._stop_requested = False
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    @classmethod
+    def create(cls, race, count, directory, seed=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """建立新的檢查點執行"""
+        if count < 1:
+            raise ValueError("模擬次數必須至少為1")
+        if chunk_size < 1:
+            raise ValueError("分塊大小必須至少為1")
+        if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+            raise ValueError(f"檢查點目錄已存在執行紀錄: {directory}")
+        os.makedirs(directory, exist_ok=True)
+
+        # 未指定種子時產生一個並記錄下來，確保可續跑
+        if seed is None:
+            seed = random.SystemRandom().randrange(2 ** 63)
+
+        run = cls(directory)
+        run.race = CamelRace.from_config(race.to_config())
+        run.race.set_seed(seed)
+        run.stats = RaceStats(run.race.camel_names)
+        run.manifest = {
+            "config": run.race.to_config(),
+            "count": count,
+            "seed": seed,
+            "chunk_size": chunk_size,
+            "completed": 0,
+            "chunks": [],
+            "stats": run.stats.to_dict(),
+            "rng_state": _rng_state_to_json(run.race.rng.getstate())
+        }
+        run._save_manifest()
+        return run
+
+    @classmethod
+    def load(cls, directory):
+        """載入既有的檢查點執行"""
+        run = cls(directory)
+        with open(run.manifest_path, 'r', encoding='utf-8') as f:
+            run.manifest = json.load(f)
+
+        run.race = CamelRace.from_config(run.manifest["config"])
+        run.race.rng.setstate(_rng_state_from_json(run.manifest["rng_state"]))
+        run.stats = RaceStats.from_dict(run.manifest["stats"])
+        return run
+
+    @property
+    def completed(self):
+        return self.manifest["completed"]
+
+    @property
+    def count(self):
+        return self.manifest["count"]
+
+    @property
+    def finished(self):
+        return self.completed >= self.count
+
+    def _save_manifest(self):
+        """寫入 manifest"""
+        _atomic_write_json(self.manifest_path, self.manifest)
+
+    def stop(self):
+        """要求在目前分塊完成後停止"""
+        self._stop_requested = True
+
+    def run(self, progress_callback=None):
+        """執行（或繼續執行）剩餘的模擬，回傳分析結果"""
+        self._stop_requested = False
+
+        while not self.finished and not self._stop_requested:
+            n = min(self.manifest["chunk_size"], self.count - self.completed)
+            batch = next(self.race.iter_races(n, batch_size=n))
+
+            # 先寫分塊，再更新 manifest；中途中斷時未記錄的分塊會被重新產生並覆蓋
+            chunk_name = CHUNK_FILE.format(len(self.manifest["chunks"]))
+            _atomic_write_chunk(os.path.join(self.directory, chunk_name), batch)
+
+            self.stats.add_batch(batch)
+            self.manifest["chunks"].append(chunk_name)
+            self.manifest["completed"] += n
+            self.manifest["stats"] = self.stats.to_dict()
+            self.manifest["rng_state"] = _rng_state_to_json(self.race.rng.getstate())
+            self._save_manifest()
+
+            if progress_callback:
+                progress_callback(self.completed, self.count)
+
+        return self.stats.to_analysis()
+
+    def iter_chunks(self):
+        """依序讀取已完成的結果分塊（NumPy 批次格式，可直接交給串流分析或匯出）"""
+        for chunk_name in self.manifest["chunks"]:
+            with np.load(os.path.join(self.directory, chunk_name)) as data:
+                yield {key: data[key] for key in data.files}
+
+def _print_analysis(analysis):
+    """在控制台顯示分析結果"""
+    if not analysis:
+        print("尚無模擬結果")
+        return
+    print(f"共 {analysis['total_races']} 場")
+    for name, rate in analysis["ranking"]:
+        print(f"駱駝{name}: {rate:.2f}%")
+
+def main(argv=None):
+    """檢查點執行的命令列入口"""
+    parser = argparse.ArgumentParser(description="可續跑的駱駝競速大量模擬")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="開始新的檢查點執行")
+    run_parser.add_argument("--config", required=True, help="save_configuration 格式的配置檔")
+    run_parser.add_argument("--count", type=int, required=True, help="模擬次數")
+    run_parser.add_argument("--dir", required=True, help="檢查點目錄")
+    run_parser.add_argument("--seed", type=int, default=None, help="亂數種子")
+    run_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每個分塊的模擬次數")
+
+    resume_parser = subparsers.add_parser("resume", help="從檢查點繼續執行")
+    resume_parser.add_argument("--dir", required=True, help="檢查點目錄")
+
+    status_parser = subparsers.add_parser("status", help="顯示檢查點進度")
+    status_parser.add_argument("--dir", required=True, help="檢查點目錄")
+
+    export_parser = subparsers.add_parser("export", help="將檢查點結果匯出為CSV")
+    export_parser.add_argument("--dir", required=True, help="檢查點目錄")
+    export_parser.add_argument("--output", required=True, help="輸出的CSV檔案")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        if args.count < 1 or args.chunk_size < 1:
+            print("模擬次數與分塊大小必須至少為1")
+            return 1
+        race = load_race(args.config)
+        if race is None:
+            return 1
+        run = CheckpointedRun.create(race, args.count, args.dir, args.seed, args.chunk_size)
+    else:
+        run = CheckpointedRun.load(args.dir)
+
+    if args.command == "status":
+        print(f"進度: {run.completed}/{run.count}，種子: {run.manifest['seed']}")
+        _print_analysis(run.stats.to_analysis())
+        return 0
+
+    if args.command == "export":
+        run.race.export_to_csv(args.output, run.iter_chunks())
+        print(f"已匯出結果至: {args.output}")
+        return 0
+
+    try:
+        analysis = run.run(print_progress)
+    except KeyboardInterrupt:
+        print(f"\n已中斷，可使用 resume 從 {run.completed}/{run.count} 繼續")
+        return 1
+
+    print()
+    _print_analysis(analysis)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,845 @@
+import os
+import csv
+import json
+import random
+import tracemalloc
+
+import numpy as np
+
+# 全局變量
+CAMEL_COLORS = ["#FF5722", "#2196F3", "#4CAF50", "#9C27B0", "#FFC107"]
+DEFAULT_CAMEL_COUNT = 5
+DEFAULT_TRACK_LENGTH = 15
+DEFAULT_SIMULATION_COUNT = 10000
+ANIMATION_SPEED = 50  # 重播每一步的間隔（毫秒）
+
+# 結果保留層級（記憶體不足時依序降級）
+RETENTION_FULL = "full"
+RETENTION_FINAL = "final"
+RETENTION_AGGREGATE = "aggregate"
+RETENTION_LABELS = {
+    RETENTION_FULL: "完整歷史",
+    RETENTION_FINAL: "僅終點位置",
+    RETENTION_AGGREGATE: "僅統計數據"
+}
+MEMORY_SAFETY_RATIO = 0.8  # 只使用記憶體預算的比例
+MEMORY_SAMPLE_RACES = 20  # 測量每場記憶體用量的樣本數
+MEMORY_CHECK_INTERVAL = 1000  # 模擬期間檢查記憶體用量的間隔
+
+# 預設規則
+DEFAULT_DICE_FACES = (1, 2, 3)
+MAX_DICE_FACE = 15  # 與比賽歷史封存格式的步數上限相同
+
+# 統計
+CONFIDENCE_Z = 1.96  # 95%信賴區間
+
+def available_memory():
+    """取得系統可用記憶體位元組數（無法取得時回傳None）"""
+    try:
+        with open("/proc/meminfo", 'r') as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except:
+        pass
+    return None
+
+class MemoryProbe:
+    """測量自建立（或 reset）以來實際增加的記憶體用量
+    
+    優先使用系統可用記憶體（MemAvailable）的減少量；無法取得時改用 tracemalloc 追蹤的配置量。
+    """
+    
+    def __init__(self):
+        """初始化並記錄目前的讀數作為基準"""
+        self.system = available_memory() is not None
+        self._started_tracing = False
+        if not self.system and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.reset()
+        
+    def _reading(self):
+        """目前的讀數（數值越大表示使用越多記憶體）"""
+        if self.system:
+            return -(available_memory() or 0)
+        return tracemalloc.get_traced_memory()[0]
+        
+    def reset(self):
+        """以目前的讀數作為新的基準"""
+        self.baseline = self._reading()
+        
+    def used(self):
+        """自基準以來增加的位元組數"""
+        return self._reading() - self.baseline
+        
+    def close(self):
+        """停止由本物件啟動的 tracemalloc"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+class RuleSet:
+    """比賽規則變體
+    
+    dice_faces           - 骰子的各面點數（可重複以表示權重，例如 (1, 1, 2, 3)）
+    reshuffle_each_round - 每回合重新抽選移動順序（預設整場比賽沿用同一順序）
+    tiles                - 特殊格 {x座標: 位移}，落在該格的駱駝（連同背上的駱駝）
+                           再前進或後退指定格數，並疊在目的地原有駱駝之上
+    規則物件建立後不應修改；需要不同規則時建立新的物件。
+    """
+    
+    __slots__ = ("dice_faces", "reshuffle_each_round", "tiles")
+    
+    def __init__(self, dice_faces=DEFAULT_DICE_FACES, reshuffle_each_round=False, tiles=None):
+        """初始化規則"""
+        self.dice_faces = tuple(int(face) for face in dice_faces)
+        self.reshuffle_each_round = bool(reshuffle_each_round)
+        self.tiles = tuple(sorted((int(x), int(shift)) for x, shift in dict(tiles or {}).items()))
+        
+    def key(self):
+        """可雜湊的規則鍵（用於快取編譯結果）"""
+        return (self.dice_faces, self.reshuffle_each_round, self.tiles)
+        
+    def __eq__(self, other):
+        return isinstance(other, RuleSet) and self.key() == other.key()
+        
+    def __hash__(self):
+        return hash(self.key())
+        
+    def is_default(self):
+        """是否為預設規則"""
+        return self == RuleSet()
+        
+    def validate(self, track_length):
+        """檢查規則設定，回傳 (是否有效, 錯誤訊息)"""
+        if not self.dice_faces:
+            return False, "骰子至少需要一個面"
+        for face in self.dice_faces:
+            if not 1 <= face <= MAX_DICE_FACE:
+                return False, f"骰子點數必須介於1到{MAX_DICE_FACE}之間"
+        for x, shift in self.tiles:
+            if not 2 <= x < track_length:
+                return False, f"特殊格 x={x} 必須位於起點之後、終點之前"
+            if shift == 0 or x + shift < 1:
+                return False, f"特殊格 x={x} 的位移無效"
+        return True, ""
+        
+    def to_dict(self):
+        """轉換為可序列化的字典"""
+        return {
+            "dice_faces": list(self.dice_faces),
+            "reshuffle_each_round": self.reshuffle_each_round,
+            "tiles": {str(x): shift for x, shift in self.tiles}
+        }
+        
+    @classmethod
+    def from_dict(cls, data):
+        """由字典還原規則"""
+        data = data or {}
+        return cls(data.get("dice_faces", DEFAULT_DICE_FACES),
+                   data.get("reshuffle_each_round", False),
+                   data.get("tiles"))
+
+class CompiledRules:
+    """編譯後的規則查表資料（同一組規則與賽道由所有引擎共用）
+    
+    dice_faces - 骰子各面點數（直接交給 rng.choice 抽樣）
+    tile_shift - 依落點x座標查詢的額外位移表（沒有特殊格時為 None，不需查表）
+    """
+    
+    __slots__ = ("rules", "camel_count", "track_length", "dice_faces", "face_values",
+                 "face_probabilities", "reshuffle_each_round", "tile_shift")
+    
+    def __init__(self, rules, camel_count, track_length):
+        """由規則與賽道建立查表資料"""
+        self.rules = rules
+        self.camel_count = camel_count
+        self.track_length = track_length
+        self.dice_faces = rules.dice_faces
+        self.face_values = sorted(set(rules.dice_faces))
+        self.face_probabilities = [rules.dice_faces.count(face) / len(rules.dice_faces)
+                                   for face in self.face_values]
+        self.reshuffle_each_round = rules.reshuffle_each_round
+        
+        self.tile_shift = None
+        if rules.tiles:
+            # 一回合內每隻駱駝最多被帶動 camel_count 次，落點不會超出此範圍
+            max_shift = max(0, max(shift for _, shift in rules.tiles))
+            size = track_length + camel_count * (max(rules.dice_faces) + max_shift) + 1
+            self.tile_shift = [0] * size
+            for x, shift in rules.tiles:
+                self.tile_shift[x] = shift
+
+_compiled_rules_cache = {}
+
+def compile_rules(rules, camel_count, track_length):
+    """取得規則的編譯結果（相同規則與賽道只編譯一次）"""
+    key = (rules.key(), camel_count, track_length)
+    compiled = _compiled_rules_cache.get(key)
+    if compiled is None:
+        compiled = _compiled_rules_cache[key] = CompiledRules(rules, camel_count, track_length)
+    return compiled
+
+class RaceStats:
+    """可合併的比賽統計累加器（不保存每場比賽細節）"""
+    
+    def __init__(self, camel_names):
+        """初始化統計欄位"""
+        self.camel_names = list(camel_names)
+        self.total_races = 0
+        self.win_counts = {name: 0 for name in self.camel_names}
+        self.position_sums = [0] * len(self.camel_names)
+        self.position_squares = [0] * len(self.camel_names)
+        
+    def add_result(self, race_result):
+        """累加一場比賽結果"""
+        self.total_races += 1
+        self.win_counts[race_result["winner"]] += 1
+        for i, camel in enumerate(race_result["final_positions"]):
+            self.position_sums[i] += camel[1]
+            self.position_squares[i] += camel[1] * camel[1]
+            
+    def add_batch(self, batch):
+        """累加一個 NumPy 批次（iter_races 的批次格式）"""
+        positions = batch["positions"].astype(np.int64)
+        self.total_races += len(batch["winners"])
+        counts = np.bincount(batch["winners"], minlength=len(self.camel_names))
+        for i, name in enumerate(self.camel_names):
+            self.win_counts[name] += int(counts[i])
+        sums = positions.sum(axis=0)
+        squares = (positions * positions).sum(axis=0)
+        for i in range(len(self.camel_names)):
+            self.position_sums[i] += int(sums[i])
+            self.position_squares[i] += int(squares[i])
+            
+    def consume(self, races):
+        """累加整個比賽串流（逐場紀錄或 NumPy 批次皆可）"""
+        for item in races:
+            if "winners" in item:
+                self.add_batch(item)
+            else:
+                self.add_result(item)
+        return self
+        
+    def merge(self, other):
+        """合併另一個統計累加器"""
+        self.total_races += other.total_races
+        for name, count in other.win_counts.items():
+            self.win_counts[name] += count
+        for i in range(len(self.camel_names)):
+            self.position_sums[i] += other.position_sums[i]
+            self.position_squares[i] += other.position_squares[i]
+        return self
+        
+    def to_analysis(self):
+        """轉換為與 analyze_results 相同格式的分析結果"""
+        if not self.total_races:
+            return None
+            
+        total_races = self.total_races
+        win_rates = {name: (count / total_races) * 100
+                     for name, count in self.win_counts.items()}
+        
+        avg_positions = np.array(self.position_sums, dtype=float) / total_races
+        variances = np.array(self.position_squares, dtype=float) / total_races - avg_positions ** 2
+        std_positions = np.sqrt(np.maximum(variances, 0.0))
+        
+        ranking = sorted(win_rates.items(), key=lambda x: x[1], reverse=True)
+        
+        return {
+            "win_rates": win_rates,
+            "avg_positions": avg_positions,
+            "std_positions": std_positions,
+            "ranking": ranking,
+            "total_races": total_races
+        }
+        
+    def to_dict(self):
+        """轉換為可序列化的字典"""
+        return {
+            "camel_names": self.camel_names,
+            "total_races": self.total_races,
+            "win_counts": dict(self.win_counts),
+            "position_sums": list(self.position_sums),
+            "position_squares": list(self.position_squares)
+        }
+        
+    @classmethod
+    def from_dict(cls, data):
+        """從字典還原統計累加器"""
+        stats = cls(data["camel_names"])
+        stats.total_races = data["total_races"]
+        stats.win_counts.update(data["win_counts"])
+        stats.position_sums = list(data["position_sums"])
+        stats.position_squares = list(data["position_squares"])
+        return stats
+
+def iter_race_rows(races, camel_names):
+    """將比賽串流展開為逐場的 (獲勝者, 各駱駝終點x座標)"""
+    for item in races:
+        if "winners" in item:
+            for winner, positions in zip(item["winners"], item["positions"]):
+                yield camel_names[winner], [int(x) for x in positions]
+        else:
+            yield item["winner"], [camel[1] for camel in item["final_positions"]]
+
+def collect_race_columns(races, camel_names):
+    """將比賽串流整理為欄位陣列（winners, positions, heights, steps）"""
+    name_index = {name: i for i, name in enumerate(camel_names)}
+    columns = {"winners": [], "positions": [], "heights": [], "steps": []}
+    records = []
+    
+    for item in races:
+        if "winners" in item:
+            for key in columns:
+                columns[key].append(np.asarray(item[key]))
+        else:
+            records.append(item)
+            
+    # 逐場紀錄轉換為欄位陣列
+    if records:
+        columns["winners"].append(np.array([name_index[r["winner"]] for r in records]))
+        columns["positions"].append(np.array([[c[1] for c in r["final_positions"]] for r in records]))
+        columns["heights"].append(np.array([[c[2] for c in r["final_positions"]] for r in records]))
+        columns["steps"].append(np.array([r["steps"] for r in records]))
+        
+    n = len(camel_names)
+    empty_shapes = {"winners": (0,), "positions": (0, n), "heights": (0, n), "steps": (0,)}
+    return {key: np.concatenate(parts).astype(np.int64) if parts else np.empty(empty_shapes[key], dtype=np.int64)
+            for key, parts in columns.items()}
+
+class CamelRace:
+    """駱駝競速模擬核心類"""
+    
+    def __init__(self, camel_count=DEFAULT_CAMEL_COUNT, track_length=DEFAULT_TRACK_LENGTH, seed=None,
+                 memory_budget=None):
+        """初始化競賽參數"""
+        self.camel_count = camel_count
+        self.track_length = track_length
+        self.camel_names = [chr(65 + i) for i in range(camel_count)]  # A, B, C, ...
+        self.x_positions = [1] * camel_count  # 默認起始位置為1
+        self.y_positions = [1] * camel_count  # 默認起始高度為1
+        self.colors = CAMEL_COLORS[:camel_count]  # 駱駝顏色
+        self.results = []  # 模擬結果
+        self.results_generation = 0  # 每次替換 results 時遞增（供介面判斷結果是否已變更）
+        self.winning_stats = {}  # 獲勝統計
+        self.current_simulation = 0  # 當前模擬次數
+        self.rng = random.Random(seed)  # 獨立亂數產生器（可設定種子以重現結果）
+        self.seed = seed  # 目前的亂數種子（None 表示未設定）
+        self.memory_budget = memory_budget  # 結果保存的記憶體預算（位元組，None為不限制）
+        self.retention = RETENTION_FULL  # 最近一次多次模擬實際使用的保留層級
+        self.stats = None  # 最近一次多次模擬的統計累加器
+        self.rules = RuleSet()  # 比賽規則
+        self.last_engine = None  # 最近一次多次模擬使用的引擎
+        self.requested_races = None  # 最近一次多次模擬請求的場數（快取回答時可能少於實際場數）
+        
+    def set_seed(self, seed):
+        """重設亂數種子"""
+        self.seed = seed
+        self.rng.seed(seed)
+        
+    def set_position(self, camel_index, x, y):
+        """設定駱駝初始位置"""
+        if 0 <= camel_index < self.camel_count:
+            self.x_positions[camel_index] = x
+            self.y_positions[camel_index] = y
+            
+    def compiled_rules(self):
+        """取得目前規則與賽道的編譯結果"""
+        return compile_rules(self.rules, self.camel_count, self.track_length)
+        
+    def validate_positions(self):
+        """檢查駱駝初始座標與規則設定的合理性"""
+        valid, error_msg = self.rules.validate(self.track_length)
+        if not valid:
+            return False, error_msg
+            
+        # 起點必須在賽道上且尚未抵達終點（特殊格查表也只涵蓋此範圍內出發的駱駝）
+        for i, x in enumerate(self.x_positions):
+            if not 1 <= x < self.track_length:
+                return False, f"駱駝{self.camel_names[i]}的起始位置 x={x} 必須介於1到{self.track_length - 1}之間"
+            
+        # 分類（x座標重複組、不重複組）
+        repeat_group = []
+        non_repeat_group = []
+        
+        # 找出重複和非重複的座標
+        for i in range(self.camel_count):
+            repeat_count = self.x_positions.count(self.x_positions[i])
+            if repeat_count > 1:
+                repeat_group.append([self.x_positions[i], self.y_positions[i], i])
+            if repeat_count == 1:
+                non_repeat_group.append([self.x_positions[i], self.y_positions[i], i])
+        
+        # 檢查非重複組y座標
+        for camel in non_repeat_group:
+            if camel[1] != 1:
+                return False, f"駱駝{self.camel_names[camel[2]]}起始堆疊高度有誤（單獨駱駝的y座標必須為1）"
+        
+        # 處理重複座標組
+        if not repeat_group:
+            return True, ""
+            
+        # 按x座標分組
+        x_values = set(item[0] for item in repeat_group)
+        for x_val in x_values:
+            same_x_camels = [item for item in repeat_group if item[0] == x_val]
+            # 按y座標排序
+            same_x_camels.sort(key=lambda item: item[1])
+            
+            # 確認y座標連續且從1開始
+            if same_x_camels[0][1] != 1:
+                return False, f"x={x_val} 位置的駱駝起始堆疊高度有誤（最底層駱駝的y座標必須為1）"
+                
+            for i in range(1, len(same_x_camels)):
+                if same_x_camels[i][1] - same_x_camels[i-1][1] != 1:
+                    return False, f"x={x_val} 位置的駱駝堆疊必須連續"
+        
+        return True, ""
+        
+    def simulate_one_race(self, record_history=True, order=None, dice=None):
+        """模擬一場比賽（record_history 為 False 時不記錄每一步狀態）
+        
+        order 可指定移動順序（駱駝索引的排列），dice 可指定前幾回合的骰子點數
+        （每回合一個長度為 camel_count 的序列，依移動順序對應），未指定的部分照常抽樣。
+        每回合重新抽選順序的規則下，order 只決定第一回合的順序。
+        """
+        rules = self.compiled_rules()
+        dice_faces = rules.dice_faces
+        tile_shift = rules.tile_shift
+        
+        # 初始化駱駝位置
+        camels = []
+        for i in range(self.camel_count):
+            camels.append([self.camel_names[i], self.x_positions[i], self.y_positions[i]])
+        
+        # 記錄每一步的移動
+        race_history = [[c.copy() for c in camels]] if record_history else None
+        
+        # 打亂駱駝移動順序
+        if order is None:
+            self.rng.shuffle(camels)
+        else:
+            camels = [camels[i] for i in order]
+        
+        # 移動駱駝直到有駱駝到達終點
+        finished = False
+        steps = 0
+        
+        while not finished and steps < 100:  # 設限防止無限循環
+            steps += 1
+            
+            # 決定移動順序
+            if rules.reshuffle_each_round and steps > 1:
+                self.rng.shuffle(camels)
+            if dice is not None and steps <= len(dice):
+                move_steps = list(dice[steps - 1])
+            else:
+                move_steps = [self.rng.choice(dice_faces) for _ in range(self.camel_count)]
+            
+            # 移動駱駝
+            for n in range(self.camel_count):
+                # 備份原始位置
+                original_positions = [c.copy() for c in camels]
+                
+                # 落在特殊格時再加上該格的位移
+                step = move_steps[n]
+                if tile_shift is not None:
+                    step += tile_shift[camels[n][1] + step]
+                
+                # 決定哪些駱駝會移動
+                moves = [0] * self.camel_count
+                for i in range(self.camel_count):
+                    if camels[n][1] == camels[i][1] and camels[n][2] <= camels[i][2]:
+                        moves[i] = step
+                
+                # 執行x座標移動
+                for m in range(self.camel_count):
+                    camels[m][1] += moves[m]
+                    
+                    # 檢查是否有駱駝到達終點
+                    if camels[m][1] >= self.track_length:
+                        finished = True
+                
+                # y座標校正
+                same_x_count = sum(1 for j in range(self.camel_count) 
+                                 if original_positions[j][1] == camels[n][1] and j != n)
+                
+                for k in range(self.camel_count):
+                    if moves[k] != 0:
+                        new_y = camels[k][2] - camels[n][2] + 1 + same_x_count
+                        camels[k][2] = new_y
+                
+                # 記錄這一步後的狀態
+                if record_history:
+                    race_history.append([c.copy() for c in camels])
+        
+        # 根據駱駝名稱排序
+        final_state = sorted([c.copy() for c in camels], key=lambda x: x[0])
+        
+        # 計算獲勝者（最接近或超過終點線的駱駝）
+        winner_idx = max(range(self.camel_count), key=lambda i: final_state[i][1])
+        winner = final_state[winner_idx][0]
+        
+        result = {
+            "final_positions": final_state,
+            "winner": winner,
+            "steps": steps
+        }
+        if record_history:
+            result["history"] = race_history
+        return result
+        
+    def effective_memory_budget(self):
+        """取得實際可用的記憶體預算（同時受限於系統可用記憶體）"""
+        budget = self.memory_budget
+        available = available_memory() if budget is not None else None
+        if available is not None:
+            budget = min(budget, available)
+        return budget
+        
+    def measure_race_bytes(self, retention, samples=MEMORY_SAMPLE_RACES):
+        """以 tracemalloc 測量在指定保留層級下每場比賽結果佔用的位元組數"""
+        if retention == RETENTION_AGGREGATE:
+            return 0
+            
+        # 使用獨立亂數產生器，避免影響正式模擬的亂數序列
+        rng, self.rng = self.rng, random.Random()
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            kept = [self.simulate_one_race(record_history=retention == RETENTION_FULL)
+                    for _ in range(samples)]
+            used = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+            self.rng = rng
+            
+        return max(used, 1) / len(kept)
+        
+    def _retention_plan(self, count):
+        """計算記憶體預算、各層級每場用量，以及能容納 count 場結果的最高保留層級"""
+        budget = self.effective_memory_budget()
+        if budget is None:
+            return RETENTION_FULL, None, {}
+            
+        race_bytes = {level: self.measure_race_bytes(level)
+                      for level in (RETENTION_FULL, RETENTION_FINAL)}
+        for retention in (RETENTION_FULL, RETENTION_FINAL):
+            if count * race_bytes[retention] <= budget * MEMORY_SAFETY_RATIO:
+                return retention, budget, race_bytes
+        return RETENTION_AGGREGATE, budget, race_bytes
+        
+    def choose_retention(self, count):
+        """依記憶體預算選擇能容納 count 場結果的最高保留層級"""
+        return self._retention_plan(count)[0]
+        
+    def _degrade_retention(self):
+        """將已保存的結果降一個保留層級以釋放記憶體"""
+        if self.retention == RETENTION_FULL:
+            for result in self.results:
+                result.pop("history", None)
+            self.retention = RETENTION_FINAL
+        else:
+            self.replace_results([])
+            self.retention = RETENTION_AGGREGATE
+            
+    def replace_results(self, results):
+        """替換保存的逐場結果並遞增結果版本"""
+        self.results = results
+        self.results_generation += 1
+        
+    def simulate_races(self, count=DEFAULT_SIMULATION_COUNT, progress_callback=None, keep_results=True,
+                       target_error=None, engine=None):
+        """執行多次模擬，由引擎登錄表依成本模型選擇預估最快的引擎
+        
+        keep_results 為 False 時不需保存逐場結果，可改用只產生統計的引擎（串流、多程序、
+        相同配置的快取）；target_error 指定時改以獲勝率精度（95%誤差範圍，百分點）決定場數；
+        engine 可指定引擎名稱。使用的引擎記錄於 last_engine。
+        """
+        from camel_race_engines import default_registry
+        return default_registry.run(self, count, progress_callback, keep_results, target_error, engine)
+        
+    def _simulate_races_scalar(self, count=DEFAULT_SIMULATION_COUNT, progress_callback=None):
+        """逐場模擬並保存結果（設定 memory_budget 時會依預算自動降低結果保留層級）"""
+        self.replace_results([])
+        self.winning_stats = {name: 0 for name in self.camel_names}
+        self.current_simulation = 0
+        self.stats = RaceStats(self.camel_names)
+        self.retention, budget, race_bytes = self._retention_plan(count)
+        
+        # 模擬期間監控實際的記憶體增長（預估的每場用量可能偏低，系統記憶體也可能被其他程序占用）
+        probe = MemoryProbe() if budget is not None and self.retention != RETENTION_AGGREGATE else None
+        limit = budget * MEMORY_SAFETY_RATIO if budget is not None else None
+        try:
+            for i in range(count):
+                self.current_simulation = i + 1
+                race_result = self.simulate_one_race(record_history=self.retention == RETENTION_FULL)
+                if self.retention != RETENTION_AGGREGATE:
+                    self.results.append(race_result)
+                self.winning_stats[race_result["winner"]] += 1
+                self.stats.add_result(race_result)
+                
+                # 實際用量超過預算時降級
+                if (probe is not None and self.retention != RETENTION_AGGREGATE
+                        and i % MEMORY_CHECK_INTERVAL == 0 and probe.used() > limit):
+                    self._degrade_retention()
+                    # 釋放的記憶體不一定歸還給系統，改以目前讀數為基準，並扣除仍保留的結果
+                    probe.reset()
+                    limit = budget * MEMORY_SAFETY_RATIO - len(self.results) * race_bytes.get(self.retention, 0)
+                
+                # 進度回調
+                if progress_callback and i % (count // 100 or 1) == 0:
+                    progress_callback(i, count)
+        finally:
+            if probe is not None:
+                probe.close()
+        
+        return self.analyze_results()
+    
+    def simulate_stats(self, count=DEFAULT_SIMULATION_COUNT):
+        """執行多次模擬，只回傳統計累加器而不保存結果"""
+        return RaceStats(self.camel_names).consume(self.iter_races(count))
+    
+    def iter_races(self, count=DEFAULT_SIMULATION_COUNT, batch_size=None):
+        """逐場產生比賽結果的生成器（不保存任何結果）
+        
+        batch_size 為 None 時逐場產出精簡紀錄（不含 history 的比賽結果字典）；
+        否則每 batch_size 場產出一個 NumPy 批次：
+            winners   - 獲勝駱駝索引 (n,)
+            positions - 各駱駝終點x座標 (n, camel_count)
+            heights   - 各駱駝終點y座標 (n, camel_count)
+            steps     - 回合數 (n,)
+        """
+        if batch_size is None:
+            for _ in range(count):
+                yield self.simulate_one_race(record_history=False)
+            return
+            
+        name_index = {name: i for i, name in enumerate(self.camel_names)}
+        done = 0
+        while done < count:
+            n = min(batch_size, count - done)
+            winners = np.empty(n, dtype=np.int8)
+            positions = np.empty((n, self.camel_count), dtype=np.int16)
+            heights = np.empty((n, self.camel_count), dtype=np.int16)
+            steps = np.empty(n, dtype=np.int16)
+            
+            for i in range(n):
+                result = self.simulate_one_race(record_history=False)
+                winners[i] = name_index[result["winner"]]
+                for j, camel in enumerate(result["final_positions"]):
+                    positions[i, j] = camel[1]
+                    heights[i, j] = camel[2]
+                steps[i] = result["steps"]
+                
+            done += n
+            yield {"winners": winners, "positions": positions, "heights": heights, "steps": steps}
+    
+    def analyze_results(self, races=None):
+        """分析模擬結果（可傳入 iter_races 的串流以常數記憶體分析）
+        
+        分析保存的結果時，"engine" 欄位為產生這些結果的模擬引擎，"requested_races"
+        為請求的場數（由快取回答時 total_races 可能大於請求的場數）。
+        """
+        if races is not None:
+            return RaceStats(self.camel_names).consume(races).to_analysis()
+            
+        if not self.results:
+            # 僅保留統計數據時改用累加器
+            if self.stats is not None:
+                analysis = self.stats.to_analysis()
+                if analysis is not None:
+                    analysis["engine"] = self.last_engine
+                    analysis["requested_races"] = self.requested_races
+                return analysis
+            return None
+            
+        # 獲勝率
+        total_races = len(self.results)
+        win_rates = {name: (count / total_races) * 100 
+                     for name, count in self.winning_stats.items()}
+        
+        # 計算每隻駱駝的平均終點位置
+        final_positions = []
+        for result in self.results:
+            positions = [camel[1] for camel in result["final_positions"]]
+            final_positions.append(positions)
+            
+        avg_positions = np.mean(final_positions, axis=0)
+        std_positions = np.std(final_positions, axis=0)
+        
+        # 計算勝率排名
+        ranking = sorted(win_rates.items(), key=lambda x: x[1], reverse=True)
+        
+        return {
+            "win_rates": win_rates,
+            "avg_positions": avg_positions,
+            "std_positions": std_positions,
+            "ranking": ranking,
+            "total_races": total_races,
+            "engine": self.last_engine,
+            "requested_races": self.requested_races
+        }
+        
+    def export_to_excel(self, filename="駱駝競速高級模擬結果.xlsx", races=None):
+        """將結果匯出到Excel檔案（可傳入 iter_races 的串流）"""
+        summary_stats = None
+        if races is None:
+            if not self.results:
+                # 僅保留統計數據時只匯出摘要
+                if self.stats is None or not self.stats.total_races:
+                    return False
+                summary_stats = self.stats
+            races = self.results
+            
+        # 延遲匯入以加快啟動
+        import openpyxl
+        
+        # 創建Excel工作簿
+        wb = openpyxl.Workbook()
+        
+        # 主要結果表
+        sheet1 = wb.active
+        sheet1.title = "模擬結果摘要"
+        
+        # 詳細結果表
+        sheet2 = wb.create_sheet("詳細模擬數據")
+        
+        # 設置表頭
+        sheet2['A1'] = '模擬次數'
+        for i, name in enumerate(self.camel_names):
+            sheet2.cell(1, i+2, f'駱駝{name}')
+        sheet2.cell(1, self.camel_count+2, '獲勝者')
+        
+        # 填充數據（邊讀取邊統計，詳細數據限制最多10000行）
+        stats = RaceStats(self.camel_names)
+        row = 2
+        for item in races:
+            stats.consume((item,))
+            for winner, positions in iter_race_rows((item,), self.camel_names):
+                if row > 10001:
+                    break
+                sheet2.cell(row, 1, row-1)
+                for j, x in enumerate(positions):
+                    sheet2.cell(row, j+2, x)
+                sheet2.cell(row, self.camel_count+2, winner)
+                row += 1
+                
+        stats = summary_stats or stats
+        analysis = stats.to_analysis()
+        if not analysis:
+            return False
+        
+        # 設置表頭
+        sheet1['A1'] = '駱駝'
+        sheet1['B1'] = '獲勝次數'
+        sheet1['C1'] = '獲勝率 (%)'
+        sheet1['D1'] = '平均終點位置'
+        sheet1['E1'] = '標準差'
+        
+        # 填充數據
+        for i, name in enumerate(self.camel_names):
+            sheet1.cell(i+2, 1, name)
+            sheet1.cell(i+2, 2, stats.win_counts[name])
+            sheet1.cell(i+2, 3, analysis["win_rates"][name])
+            sheet1.cell(i+2, 4, analysis["avg_positions"][i])
+            sheet1.cell(i+2, 5, analysis["std_positions"][i])
+        
+        # 保存結果
+        wb.save(filename)
+        return True
+        
+    def export_to_csv(self, filename="駱駝競速模擬結果.csv", races=None):
+        """將每場結果逐行寫入CSV檔案（串流寫入，不限行數）"""
+        if races is None:
+            if not self.results:
+                return False
+            races = self.results
+            
+        with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['模擬次數'] + [f'駱駝{name}' for name in self.camel_names] + ['獲勝者'])
+            for i, (winner, positions) in enumerate(iter_race_rows(races, self.camel_names)):
+                writer.writerow([i+1] + positions + [winner])
+        
+        return True
+        
+    def to_config(self):
+        """取得當前配置字典"""
+        return {
+            "camel_count": self.camel_count,
+            "track_length": self.track_length,
+            "x_positions": self.x_positions,
+            "y_positions": self.y_positions,
+            "colors": self.colors,
+            "rules": self.rules.to_dict()
+        }
+        
+    def apply_config(self, config):
+        """套用配置字典"""
+        self.camel_count = config.get("camel_count", DEFAULT_CAMEL_COUNT)
+        self.track_length = config.get("track_length", DEFAULT_TRACK_LENGTH)
+        self.x_positions = config.get("x_positions", [1] * self.camel_count)
+        self.y_positions = config.get("y_positions", [1] * self.camel_count)
+        self.colors = config.get("colors", CAMEL_COLORS[:self.camel_count])
+        self.camel_names = [chr(65 + i) for i in range(self.camel_count)]
+        self.rules = RuleSet.from_dict(config.get("rules"))
+        
+    @classmethod
+    def from_config(cls, config):
+        """由配置字典建立比賽"""
+        race = cls()
+        race.apply_config(config)
+        return race
+        
+    def save_configuration(self, filename="camel_race_config.json"):
+        """保存當前配置"""
+        config = self.to_config()
+        
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=4)
+        
+        return True
+        
+    def load_configuration(self, filename="camel_race_config.json"):
+        """載入配置"""
+        if not os.path.exists(filename):
+            return False
+            
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+                
+            self.apply_config(config)
+            
+            return True
+        except:
+            return False
+
+def simulate_shard(config, count, seed=None):
+    """模擬一個分片並回傳統計字典（工作程序、執行器與工作節點共用）"""
+    race = CamelRace.from_config(config)
+    if seed is not None:
+        race.set_seed(seed)
+    return race.simulate_stats(count).to_dict()
+
+def print_progress(current, total, label="執行模擬"):
+    """在控制台顯示進度"""
+    print(f"\r{label}... {current}/{total} ({current / total * 100:.1f}%)", end="", flush=True)
+
+def load_race(filename, seed=None):
+    """命令列工具共用：載入並檢查配置檔，失敗時印出原因並回傳 None"""
+    race = CamelRace(seed=seed)
+    if not race.load_configuration(filename):
+        print(f"載入配置失敗: {filename}")
+        return None
+    valid, error_msg = race.validate_positions()
+    if not valid:
+        print(f"配置無效: {error_msg}")
+        return None
+    return race
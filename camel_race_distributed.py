@@ -0,0 +1,320 @@
+import sys
+import json
+import time
+import socket
+import random
+import argparse
+import threading
+import itertools
+import socketserver
+import multiprocessing
+from collections import deque
+
+from camel_race_core import RaceStats, simulate_shard, print_progress, load_race
+
+# 分散式模擬預設參數
+DEFAULT_PORT = 8766
+DEFAULT_SHARD_SIZE = 20000
+DEFAULT_POLL_DELAY = 0.2  # 秒
+CONNECT_RETRY_DELAY = 1.0  # 秒
+
+def shard_seed(seed, index):
+    """由工作種子與分片編號推導分片種子（與由哪個工作節點執行無關）"""
+    return seed * (1 << 32) + index
+
+def _send(stream, message):
+    """送出一則以換行分隔的JSON訊息"""
+    stream.write(json.dumps(message).encode("utf-8") + b"\n")
+    stream.flush()
+
+def _receive(stream):
+    """接收一則JSON訊息，連線關閉時回傳 None"""
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line.decode("utf-8"))
+
+class _Job:
+    """一個分散式模擬工作（配置、種子範圍與分片狀態）"""
+
+    def __init__(self, job_id, config, count, seed, shard_size):
+        self.job_id = job_id
+        self.config = config
+        self.count = count
+        self.seed = seed
+        self.shard_counts = [shard_size] * (count // shard_size)
+        if count % shard_size:
+            self.shard_counts.append(count % shard_size)
+        self.pending = deque(range(len(self.shard_counts)))
+        self.in_flight = {}  # 分片編號 -> 執行中的工作節點集合
+        self.results = {}  # 分片編號 -> 統計字典
+        self.completed_races = 0
+        self.done = threading.Event()
+
+    def assignment(self, index):
+        """建立分片指派訊息"""
+        return {
+            "type": "shard",
+            "job_id": self.job_id,
+            "index": index,
+            "config": self.config,
+            "seed": shard_seed(self.seed, index),
+            "count": self.shard_counts[index]
+        }
+
+class _WorkerHandler(socketserver.StreamRequestHandler):
+    """處理單一工作節點連線"""
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        worker_id = coordinator._register_worker(self.client_address)
+        try:
+            while True:
+                message = _receive(self.rfile)
+                if message is None:
+                    break
+                if message["type"] == "request":
+                    _send(self.wfile, coordinator._next_assignment(worker_id))
+                elif message["type"] == "result":
+                    coordinator._complete(worker_id, message["job_id"], message["index"], message["stats"])
+        except (OSError, ValueError):
+            pass
+        finally:
+            coordinator._worker_lost(worker_id)
+
+class _CoordinatorServer(socketserver.ThreadingTCPServer):
+    """協調器的TCP伺服器"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+class Coordinator:
+    """分散式模擬協調器
+
+    工作節點透過TCP主動索取分片（拉取模式）；佇列清空後，閒置節點會重複執行
+    其他節點尚未完成的分片（工作竊取），先回傳者為準。每個分片的種子只由工作種子
+    與分片編號決定，因此不論由哪個節點執行、是否被重新指派，合併結果都相同。
+    斷線節點手上的分片會重新放回佇列。
+    """
+
+    def __init__(self, host="0.0.0.0", port=DEFAULT_PORT, poll_delay=DEFAULT_POLL_DELAY):
+        """初始化協調器"""
+        self.poll_delay = poll_delay
+        self._server = _CoordinatorServer((host, port), _WorkerHandler)
+        self._server.coordinator = self
+        self._lock = threading.Lock()
+        self._job = None
+        self._job_ids = itertools.count(1)
+        self._worker_ids = itertools.count(1)
+        self._workers = {}
+        self._shutting_down = False
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    @property
+    def worker_count(self):
+        with self._lock:
+            return len(self._workers)
+
+    def start(self):
+        """在背景執行緒啟動伺服器"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """通知工作節點結束並關閉伺服器"""
+        with self._lock:
+            self._shutting_down = True
+        # 給閒置節點一次輪詢的時間收到結束訊息
+        time.sleep(self.poll_delay * 2)
+        self._server.shutdown()
+        self._server.server_close()
+
+    def run(self, race, count, seed=None, shard_size=DEFAULT_SHARD_SIZE, progress_callback=None):
+        """將模擬工作分派給工作節點，阻塞直到完成並回傳分析結果"""
+        if count < 1:
+            raise ValueError("模擬次數必須至少為1")
+        if shard_size < 1:
+            raise ValueError("分片大小必須至少為1")
+        if seed is None:
+            seed = random.SystemRandom().randrange(2 ** 31)
+
+        job = _Job(next(self._job_ids), race.to_config(), count, seed, shard_size)
+        with self._lock:
+            self._job = job
+
+        reported = -1
+        while not job.done.wait(0.1):
+            if progress_callback and job.completed_races != reported:
+                reported = job.completed_races
+                progress_callback(reported, count)
+
+        with self._lock:
+            self._job = None
+
+        # 依分片編號順序合併，確保結果可重現
+        stats = RaceStats(race.camel_names)
+        for index in range(len(job.shard_counts)):
+            stats.merge(RaceStats.from_dict(job.results[index]))
+
+        if progress_callback:
+            progress_callback(count, count)
+        return stats.to_analysis()
+
+    def _register_worker(self, address):
+        """登記新連線的工作節點"""
+        with self._lock:
+            worker_id = next(self._worker_ids)
+            self._workers[worker_id] = address
+            return worker_id
+
+    def _next_assignment(self, worker_id):
+        """為工作節點挑選下一個分片"""
+        with self._lock:
+            if self._shutting_down:
+                return {"type": "shutdown"}
+
+            job = self._job
+            if job is None or job.done.is_set():
+                return {"type": "wait", "delay": self.poll_delay}
+
+            # 優先分派尚未執行的分片
+            while job.pending:
+                index = job.pending.popleft()
+                if index not in job.results:
+                    job.in_flight.setdefault(index, set()).add(worker_id)
+                    return job.assignment(index)
+
+            # 佇列已空：竊取執行者最少、編號最小且自己未執行中的分片
+            candidates = [index for index, workers in job.in_flight.items()
+                          if worker_id not in workers]
+            if candidates:
+                index = min(candidates, key=lambda i: (len(job.in_flight[i]), i))
+                job.in_flight[index].add(worker_id)
+                return job.assignment(index)
+
+            return {"type": "wait", "delay": self.poll_delay}
+
+    def _complete(self, worker_id, job_id, index, stats):
+        """記錄分片結果（重複的結果直接捨棄）"""
+        with self._lock:
+            job = self._job
+            if job is None or job.job_id != job_id or index in job.results:
+                return
+
+            job.results[index] = stats
+            job.in_flight.pop(index, None)
+            job.completed_races += job.shard_counts[index]
+            if len(job.results) == len(job.shard_counts):
+                job.done.set()
+
+    def _worker_lost(self, worker_id):
+        """工作節點斷線：將其手上唯一執行者的分片放回佇列"""
+        with self._lock:
+            self._workers.pop(worker_id, None)
+            job = self._job
+            if job is None:
+                return
+
+            for index in sorted(job.in_flight, reverse=True):
+                workers = job.in_flight[index]
+                workers.discard(worker_id)
+                if not workers:
+                    del job.in_flight[index]
+                    job.pending.appendleft(index)
+
+def run_worker(host, port, connect_timeout=30.0):
+    """工作節點主迴圈：連線至協調器，索取分片並回傳統計結果"""
+    deadline = time.time() + connect_timeout
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(CONNECT_RETRY_DELAY)
+
+    with sock, sock.makefile("rwb") as stream:
+        while True:
+            _send(stream, {"type": "request"})
+            message = _receive(stream)
+            if message is None or message["type"] == "shutdown":
+                break
+            if message["type"] == "wait":
+                time.sleep(message["delay"])
+                continue
+
+            stats = simulate_shard(message["config"], message["count"], message["seed"])
+            _send(stream, {
+                "type": "result",
+                "job_id": message["job_id"],
+                "index": message["index"],
+                "stats": stats
+            })
+
+def start_local_workers(host, port, count):
+    """在本機啟動多個工作節點程序（用於測試或單機多核）"""
+    workers = []
+    for _ in range(count):
+        process = multiprocessing.Process(target=run_worker, args=(host, port), daemon=True)
+        process.start()
+        workers.append(process)
+    return workers
+
+def main(argv=None):
+    """分散式模擬的命令列入口"""
+    parser = argparse.ArgumentParser(description="駱駝競速分散式模擬")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    coordinator_parser = subparsers.add_parser("coordinator", help="啟動協調器並執行一個模擬工作")
+    coordinator_parser.add_argument("--config", required=True, help="save_configuration 格式的配置檔")
+    coordinator_parser.add_argument("--count", type=int, required=True, help="模擬次數")
+    coordinator_parser.add_argument("--seed", type=int, default=None, help="亂數種子")
+    coordinator_parser.add_argument("--host", default="0.0.0.0", help="監聽位址")
+    coordinator_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="監聽埠號")
+    coordinator_parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="每個分片的模擬次數")
+    coordinator_parser.add_argument("--local-workers", type=int, default=0, help="同時在本機啟動的工作節點數量")
+
+    worker_parser = subparsers.add_parser("worker", help="啟動工作節點")
+    worker_parser.add_argument("--host", required=True, help="協調器位址")
+    worker_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="協調器埠號")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        run_worker(args.host, args.port)
+        return 0
+
+    race = load_race(args.config)
+    if race is None:
+        return 1
+    if args.count < 1 or args.shard_size < 1:
+        print("模擬次數與分片大小必須至少為1")
+        return 1
+
+    coordinator = Coordinator(args.host, args.port)
+    coordinator.start()
+    print(f"協調器已啟動: {args.host}:{args.port}")
+
+    workers = []
+    if args.local_workers:
+        workers = start_local_workers("127.0.0.1", args.port, args.local_workers)
+
+    try:
+        analysis = coordinator.run(race, args.count, args.seed, args.shard_size, print_progress)
+    finally:
+        coordinator.stop()
+        for process in workers:
+            process.join(timeout=5)
+
+    print()
+    print(f"共 {analysis['total_races']} 場")
+    for name, rate in analysis["ranking"]:
+        print(f"駱駝{name}: {rate:.2f}%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,444 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from camel_race_core import (CamelRace, RaceStats, RETENTION_AGGREGATE, DEFAULT_SIMULATION_COUNT, CONFIDENCE_Z,
+                             simulate_shard, print_progress, load_race)
+
+# 引擎名稱
+ENGINE_SCALAR = "scalar"  # 逐場模擬並保存結果（simulate_one_race 迴圈）
+ENGINE_STREAM = "stream"  # 逐場模擬，只累加統計
+ENGINE_POOL = "pool"  # 多程序分片模擬，只累加統計
+ENGINE_CACHE = "cache"  # 使用先前相同配置的統計，不足的場數再補模擬
+
+# 成本模型檔案（calibrate 指令寫入）
+COST_MODEL_FILE = os.path.join(os.path.expanduser("~"), ".camel_race_advanced", "engine_costs.json")
+
+# 未校準時的預設成本模型：秒數 = startup（僅第一次）+ setup + 場數 × 每場工作量 × per_unit / 平行數
+DEFAULT_COST_MODEL = {
+    ENGINE_SCALAR: {"startup": 0.0, "setup": 0.0, "per_unit": 5.5e-6},
+    ENGINE_STREAM: {"startup": 0.0, "setup": 0.0, "per_unit": 1.9e-6},
+    ENGINE_POOL: {"startup": 0.5, "setup": 0.02, "per_unit": 1.9e-6},
+    ENGINE_CACHE: {"startup": 0.0, "setup": 1e-5, "per_unit": 0.0}
+}
+
+DEFAULT_CACHE_SIZE = 64  # 保留統計的配置數量
+DECISION_LOG_SIZE = 1000  # 保留的引擎選擇紀錄筆數
+POOL_SHARDS_PER_WORKER = 4
+CALIBRATION_COUNTS = (500, 4000)  # 校準時每個配置使用的兩種場數
+
+def race_work(race):
+    """估計一場比賽的工作量（駱駝數 × 預期回合數），用於成本模型"""
+    faces = race.compiled_rules().dice_faces
+    distance = race.track_length - max(race.x_positions) + 1
+    return race.camel_count * (max(distance, 1) / (sum(faces) / len(faces)) + 1)
+
+def required_races(target_error, z=CONFIDENCE_Z):
+    """獲勝率的95%誤差範圍（百分點）不超過 target_error 所需的場數（以最壞情況 p=0.5 估計）"""
+    if target_error <= 0:
+        raise ValueError("精度必須大於0")
+    return int(math.ceil((z * 50 / target_error) ** 2))
+
+def uses_cache(race):
+    """比賽是否可使用統計快取（設定種子的比賽需要可重現的結果，不讀寫快取）"""
+    return race.seed is None
+
+def config_key(race):
+    """影響模擬結果的配置內容（作為統計快取鍵）"""
+    return (race.camel_count, race.track_length, tuple(int(x) for x in race.x_positions),
+            tuple(int(y) for y in race.y_positions), race.rules.key())
+
+def copy_stats(stats):
+    """複製統計累加器"""
+    return RaceStats.from_dict(stats.to_dict())
+
+class Engine:
+    """模擬引擎基底類
+
+    子類別提供 name、label 與 run(race, count, progress_callback)：只產生統計的
+    引擎回傳 RaceStats，保存逐場結果的引擎直接填入 race 並回傳 None。
+    estimate 回傳預估秒數（無法處理此請求時回傳 None）。
+    """
+
+    name = None
+    label = None
+    produces_results = False  # 是否能保存逐場結果
+    parallelism = 1
+
+    def is_started(self):
+        """是否已完成一次性的啟動（例如建立程序池）"""
+        return True
+
+    def estimate(self, race, count, model, keep_results=True):
+        """預估執行 count 場所需的秒數"""
+        if keep_results and not self.produces_results:
+            return None
+        cost = model[self.name]
+        seconds = cost["setup"] + count * race_work(race) * cost["per_unit"] / self.parallelism
+        if not self.is_started():
+            seconds += cost["startup"]
+        return seconds
+
+class ScalarEngine(Engine):
+    """逐場模擬並保存結果（依記憶體預算降低保留層級）"""
+
+    name = ENGINE_SCALAR
+    label = "逐場模擬"
+    produces_results = True
+
+    def run(self, race, count, progress_callback=None):
+        race._simulate_races_scalar(count, progress_callback)
+        return None
+
+class StreamEngine(Engine):
+    """逐場模擬，只累加統計（不保存任何結果）"""
+
+    name = ENGINE_STREAM
+    label = "串流統計"
+
+    def run(self, race, count, progress_callback=None):
+        stats = RaceStats(race.camel_names)
+        interval = count // 100 or 1
+        for i, result in enumerate(race.iter_races(count)):
+            stats.add_result(result)
+            if progress_callback and i % interval == 0:
+                progress_callback(i, count)
+        return stats
+
+class PoolEngine(Engine):
+    """多程序分片模擬（程序池建立後重複使用），分片種子由比賽的亂數產生器產生"""
+
+    name = ENGINE_POOL
+    label = "多程序"
+
+    def __init__(self, workers=None):
+        self.parallelism = workers or os.cpu_count() or 1
+        self._pool = None
+
+    def is_started(self):
+        return self._pool is not None
+
+    def start(self):
+        """建立程序池"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.parallelism)
+        return self._pool
+
+    def shutdown(self):
+        """關閉程序池"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def run(self, race, count, progress_callback=None):
+        pool = self.start()
+        config = race.to_config()
+        shard_size = max(1, -(-count // (self.parallelism * POOL_SHARDS_PER_WORKER)))
+        futures = [pool.submit(simulate_shard, config, min(shard_size, count - start), race.rng.getrandbits(63))
+                   for start in range(0, count, shard_size)]
+
+        stats = RaceStats(race.camel_names)
+        for future in as_completed(futures):
+            stats.merge(RaceStats.from_dict(future.result()))
+            if progress_callback:
+                progress_callback(stats.total_races, count)
+        return stats
+
+class CacheEngine(Engine):
+    """使用先前相同配置累積的統計；場數不足時以最快的其他引擎補足差額
+
+    快取的場數多於請求時回傳全部快取的統計（分析結果的 total_races 會大於
+    requested_races）。設定種子的比賽不使用快取。
+    """
+
+    name = ENGINE_CACHE
+    label = "快取統計"
+
+    def __init__(self, registry, size=DEFAULT_CACHE_SIZE):
+        self.registry = registry
+        self.size = size
+        self.entries = OrderedDict()  # 配置 -> RaceStats
+
+    def get(self, race):
+        """取得配置的快取統計"""
+        if not uses_cache(race):
+            return None
+        key = config_key(race)
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def add(self, race, stats):
+        """將新的統計併入快取"""
+        if not uses_cache(race):
+            return
+        key = config_key(race)
+        if key in self.entries:
+            self.entries[key].merge(stats)
+            self.entries.move_to_end(key)
+        else:
+            self.entries[key] = copy_stats(stats)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """清除快取"""
+        self.entries.clear()
+
+    def _top_up_engine(self, race, remaining):
+        """補足差額使用的引擎與預估秒數（只考慮產生統計的引擎）"""
+        exclude = [name for name, engine in self.registry.engines.items()
+                   if engine is self or engine.produces_results]
+        return self.registry.cheapest(race, remaining, keep_results=False, exclude=exclude)
+
+    def estimate(self, race, count, model, keep_results=True):
+        if keep_results:
+            return None
+        cached = self.get(race)
+        if cached is None:
+            return None
+        seconds = model[self.name]["setup"]
+        remaining = count - cached.total_races
+        if remaining > 0:
+            seconds += self._top_up_engine(race, remaining)[1]
+        return seconds
+
+    def run(self, race, count, progress_callback=None):
+        cached = self.get(race)
+        remaining = count - cached.total_races
+        if remaining > 0:
+            engine_name = self._top_up_engine(race, remaining)[0]
+            self.add(race, self.registry.engines[engine_name].run(race, remaining, progress_callback))
+        return copy_stats(cached)
+
+class EngineRegistry:
+    """模擬引擎登錄表：依成本模型預估每個引擎的耗時並選擇最快者
+
+    CamelRace.simulate_races 經由此登錄表執行。需要逐場結果時只有逐場模擬引擎
+    可用；只需要統計時會比較串流、多程序與快取（相同配置先前的統計）的成本。
+    每次執行都記錄選用的引擎、預估與實際耗時。
+    """
+
+    def __init__(self, model=None):
+        self.engines = OrderedDict()
+        self._model = model
+        self.log = deque(maxlen=DECISION_LOG_SIZE)
+        self.cache = CacheEngine(self)
+        for engine in (ScalarEngine(), StreamEngine(), PoolEngine(), self.cache):
+            self.register(engine)
+
+    @property
+    def model(self):
+        """成本模型（第一次使用時載入校準檔）"""
+        if self._model is None:
+            self._model = load_cost_model()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def register(self, engine):
+        """登錄引擎（同名引擎會被取代）"""
+        self.engines[engine.name] = engine
+        return engine
+
+    def estimates(self, race, count, keep_results=True):
+        """各引擎的預估秒數（無法處理此請求的引擎為 None）"""
+        return {name: engine.estimate(race, count, self.model, keep_results)
+                for name, engine in self.engines.items()}
+
+    def cheapest(self, race, count, keep_results=True, exclude=()):
+        """預估最快的引擎，回傳 (名稱, 預估秒數)"""
+        best = None
+        for name, engine in self.engines.items():
+            if name in exclude:
+                continue
+            seconds = engine.estimate(race, count, self.model, keep_results)
+            if seconds is not None and (best is None or seconds < best[1]):
+                best = (name, seconds)
+        if best is None:
+            raise ValueError("沒有可處理此請求的引擎")
+        return best
+
+    def select(self, race, count, keep_results=True):
+        """選擇預估最快的引擎，回傳 (名稱, 各引擎預估秒數)"""
+        estimates = self.estimates(race, count, keep_results)
+        return self.cheapest(race, count, keep_results)[0], estimates
+
+    def run(self, race, count=DEFAULT_SIMULATION_COUNT, progress_callback=None, keep_results=True,
+            target_error=None, engine=None):
+        """以選定（或指定）的引擎執行模擬，結果填入 race 並回傳分析結果"""
+        if target_error is not None:
+            count = required_races(target_error)
+
+        name, estimates = self.select(race, count, keep_results)
+        if engine is not None:
+            if engine not in self.engines:
+                raise ValueError(f"找不到引擎: {engine}")
+            if estimates[engine] is None:
+                raise ValueError(f"引擎 {engine} 無法處理此請求")
+            name = engine
+
+        started = time.perf_counter()
+        stats = self.engines[name].run(race, count, progress_callback)
+        elapsed = time.perf_counter() - started
+
+        if stats is not None:
+            race.replace_results([])
+            race.stats = stats
+            race.winning_stats = dict(stats.win_counts)
+            race.retention = RETENTION_AGGREGATE
+            race.current_simulation = count
+        # 快取引擎自行更新快取，其餘引擎的統計併入快取供之後的請求使用
+        if name != ENGINE_CACHE and race.stats is not None:
+            self.cache.add(race, race.stats)
+
+        race.last_engine = name
+        race.requested_races = count
+        self.log.append({
+            "engine": name,
+            "camel_count": race.camel_count,
+            "track_length": race.track_length,
+            "count": count,
+            "total_races": race.stats.total_races if race.stats is not None else len(race.results),
+            "keep_results": keep_results,
+            "estimated": estimates[name],
+            "elapsed": elapsed
+        })
+        return race.analyze_results()
+
+# 預設登錄表（CamelRace.simulate_races 使用）
+default_registry = EngineRegistry()
+
+def load_cost_model(filename=COST_MODEL_FILE):
+    """載入成本模型（沒有校準檔或格式錯誤時使用預設值）"""
+    model = {name: dict(cost) for name, cost in DEFAULT_COST_MODEL.items()}
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for name, cost in data.get("engines", {}).items():
+            model.setdefault(name, {"startup": 0.0, "setup": 0.0, "per_unit": 0.0}).update(cost)
+    except:
+        pass
+    return model
+
+def save_cost_model(model, filename=COST_MODEL_FILE):
+    """保存成本模型"""
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump({
+            "cpu_count": os.cpu_count(),
+            "calibrated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "engines": model
+        }, f, indent=4)
+
+def _fit_cost(samples):
+    """以最小平方法擬合 秒數 = setup + 工作量 × per_unit（係數不為負）"""
+    units = np.array([u for u, _ in samples], dtype=float)
+    seconds = np.array([s for _, s in samples], dtype=float)
+    per_unit, setup = np.polyfit(units, seconds, 1)
+    if per_unit <= 0:
+        per_unit = float(seconds.sum() / units.sum())
+        setup = 0.0
+    return max(float(setup), 0.0), float(per_unit)
+
+def calibrate(registry=None, corpus=None, counts=CALIBRATION_COUNTS, seed=0, progress_callback=None):
+    """在本機上為每個模擬引擎計時並擬合成本模型（corpus 預設為等價性檢驗的配置集）"""
+    if corpus is None:
+        from camel_race_equivalence import DEFAULT_CORPUS as corpus
+    registry = registry or default_registry
+    model = {name: dict(cost) for name, cost in registry.model.items()}
+    targets = [name for name in (ENGINE_SCALAR, ENGINE_STREAM, ENGINE_POOL) if name in registry.engines]
+    total = len(targets) * len(corpus) * len(counts)
+    done = 0
+
+    for name in targets:
+        engine = registry.engines[name]
+        cost = model.setdefault(name, {"startup": 0.0, "setup": 0.0, "per_unit": 0.0})
+
+        # 一次性的啟動成本（例如建立程序池並預熱）
+        if isinstance(engine, PoolEngine):
+            engine.shutdown()
+            started = time.perf_counter()
+            engine.start()
+            engine.run(CamelRace.from_config(corpus[0][1]), engine.parallelism)
+            cost["startup"] = time.perf_counter() - started
+
+        samples = []
+        for _, config in corpus:
+            race = CamelRace.from_config(config)
+            race.set_seed(seed)
+            work = race_work(race) / engine.parallelism
+            for count in counts:
+                started = time.perf_counter()
+                engine.run(race, count)
+                samples.append((count * work, time.perf_counter() - started))
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+        cost["setup"], cost["per_unit"] = _fit_cost(samples)
+
+    registry.model = model
+    return model
+
+def format_estimates(estimates, registry=None):
+    """將各引擎預估秒數格式化為文字"""
+    registry = registry or default_registry
+    lines = []
+    for name, seconds in estimates.items():
+        label = registry.engines[name].label
+        lines.append(f"- {name}（{label}）: " + ("不適用" if seconds is None else f"{seconds:.3f} 秒"))
+    return "\n".join(lines)
+
+def main(argv=None):
+    """引擎登錄表的命令列入口"""
+    parser = argparse.ArgumentParser(description="模擬引擎成本模型的校準與查詢")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    calibrate_parser = subparsers.add_parser("calibrate", help="在本機為各引擎計時並保存成本模型")
+    calibrate_parser.add_argument("--output", default=COST_MODEL_FILE, help="成本模型檔案")
+    calibrate_parser.add_argument("--seed", type=int, default=0, help="亂數種子")
+
+    plan_parser = subparsers.add_parser("plan", help="顯示各引擎對指定配置的預估耗時與選擇結果")
+    plan_parser.add_argument("--config", required=True, help="save_configuration 格式的配置檔")
+    plan_parser.add_argument("--count", type=int, default=DEFAULT_SIMULATION_COUNT, help="模擬次數")
+    plan_parser.add_argument("--target-error", type=float, default=None,
+                             help="改以獲勝率精度（95%%誤差範圍，百分點）決定模擬次數")
+    plan_parser.add_argument("--keep-results", action="store_true", help="需要保存逐場結果")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "calibrate":
+        model = calibrate(seed=args.seed, progress_callback=lambda current, total: print_progress(current, total, "校準中"))
+        print()
+        save_cost_model(model, args.output)
+        for name, cost in model.items():
+            print(f"{name}: 啟動 {cost['startup']:.3f}s，每次 {cost['setup']:.4f}s，"
+                  f"每單位工作 {cost['per_unit'] * 1e6:.3f}µs")
+        print(f"已保存成本模型: {args.output}")
+        return 0
+
+    race = load_race(args.config)
+    if race is None:
+        return 1
+
+    count = required_races(args.target_error) if args.target_error is not None else args.count
+    name, estimates = default_registry.select(race, count, args.keep_results)
+    print(f"{count} 場，每場工作量 {race_work(race):.1f}")
+    print(format_estimates(estimates))
+    print(f"選用引擎: {name}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
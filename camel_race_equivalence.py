@@ -0,0 +1,260 @@
+import sys
+import math
+import time
+import argparse
+import importlib
+import itertools
+
+import numpy as np
+
+from camel_race_core import CamelRace, collect_race_columns
+
+# 等價性檢驗預設參數
+DEFAULT_RACE_COUNT = 20000
+DEFAULT_ALPHA = 0.001
+MIN_BIN_COUNT = 10  # 位置分佈合併稀疏區間時，每個區間的最少場數
+
+# 測試配置集：堆疊起點、接近終點、長賽道等
+DEFAULT_CORPUS = [
+    ("分散起點", {"camel_count": 5, "track_length": 15,
+              "x_positions": [1, 2, 3, 4, 5], "y_positions": [1, 1, 1, 1, 1]}),
+    ("全部堆疊", {"camel_count": 5, "track_length": 15,
+              "x_positions": [1, 1, 1, 1, 1], "y_positions": [1, 2, 3, 4, 5]}),
+    ("混合堆疊", {"camel_count": 5, "track_length": 15,
+              "x_positions": [2, 2, 3, 3, 3], "y_positions": [1, 2, 1, 2, 3]}),
+    ("接近終點", {"camel_count": 5, "track_length": 15,
+              "x_positions": [12, 13, 13, 14, 11], "y_positions": [1, 1, 2, 1, 1]}),
+    ("長賽道", {"camel_count": 5, "track_length": 30,
+             "x_positions": [1, 2, 2, 4, 5], "y_positions": [1, 1, 2, 1, 1]}),
+]
+
+def reference_engine(config, count, seed):
+    """參考引擎：simulate_one_race 的逐場迴圈"""
+    race = CamelRace.from_config(config)
+    race.set_seed(seed)
+    return race.iter_races(count)
+
+def reference_trajectories(config, count, seed):
+    """參考引擎的逐場完整軌跡（與 reference_engine 相同的亂數序列）"""
+    race = CamelRace.from_config(config)
+    race.set_seed(seed)
+    for _ in range(count):
+        yield race.simulate_one_race()["history"]
+
+# 參考引擎與自身的亂數序列相同，可逐場比對；提供 trajectories 的引擎可比對完整軌跡
+reference_engine.seed_compatible = True
+reference_engine.trajectories = reference_trajectories
+
+def _gammainc_upper(a, x):
+    """正規化上不完全伽瑪函數 Q(a, x)"""
+    if x <= 0:
+        return 1.0
+    log_prefix = -x + a * math.log(x) - math.lgamma(a)
+
+    if x < a + 1:
+        # 級數展開求 P(a, x)
+        term = total = 1.0 / a
+        n = a
+        for _ in range(1000):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+
+    # 連分式求 Q(a, x)（Lentz 方法）
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = d if abs(d) > tiny else tiny
+        c = b + an / c
+        c = c if abs(c) > tiny else tiny
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(log_prefix) * h
+
+def chi2_sf(statistic, dof):
+    """卡方分佈的右尾機率"""
+    if dof <= 0:
+        return 1.0
+    return _gammainc_upper(dof / 2.0, statistic / 2.0)
+
+def chi2_homogeneity(counts_a, counts_b):
+    """兩組計數的卡方同質性檢定，回傳 (統計量, 自由度, p值)"""
+    table = np.array([counts_a, counts_b], dtype=float)
+    table = table[:, table.sum(axis=0) > 0]
+    if table.shape[1] < 2:
+        return 0.0, 0, 1.0
+
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0, keepdims=True) / table.sum()
+    statistic = float(((table - expected) ** 2 / expected).sum())
+    dof = table.shape[1] - 1
+    return statistic, dof, chi2_sf(statistic, dof)
+
+def _pooled_histograms(values_a, values_b):
+    """建立兩組位置的直方圖，並合併相鄰的稀疏區間"""
+    low = min(values_a.min(), values_b.min())
+    high = max(values_a.max(), values_b.max())
+    hist_a = np.bincount(values_a - low, minlength=high - low + 1)
+    hist_b = np.bincount(values_b - low, minlength=high - low + 1)
+
+    pooled_a, pooled_b = [], []
+    bin_a = bin_b = 0
+    for a, b in zip(hist_a, hist_b):
+        bin_a += a
+        bin_b += b
+        if bin_a + bin_b >= MIN_BIN_COUNT:
+            pooled_a.append(bin_a)
+            pooled_b.append(bin_b)
+            bin_a = bin_b = 0
+    if bin_a + bin_b:
+        if pooled_a:
+            pooled_a[-1] += bin_a
+            pooled_b[-1] += bin_b
+        else:
+            pooled_a.append(bin_a)
+            pooled_b.append(bin_b)
+    return pooled_a, pooled_b
+
+def _timed_run(engine, config, count, seed):
+    """執行引擎並計時（包含消耗整個串流的時間）"""
+    camel_names = CamelRace.from_config(config).camel_names
+    started = time.perf_counter()
+    columns = collect_race_columns(engine(config, count, seed), camel_names)
+    return columns, time.perf_counter() - started
+
+def _same_trajectories(reference, candidate, config, count, seed):
+    """逐場比對兩個引擎的完整軌跡（每一步所有駱駝的座標）"""
+    ref_iter = reference.trajectories(config, count, seed)
+    cand_iter = candidate.trajectories(config, count, seed)
+    missing = object()
+    for ref_history, cand_history in itertools.zip_longest(ref_iter, cand_iter, fillvalue=missing):
+        if ref_history is missing or cand_history is missing:
+            return False
+        if [[list(camel) for camel in state] for state in ref_history] != \
+                [[list(camel) for camel in state] for state in cand_history]:
+            return False
+    return True
+
+def compare_engine(candidate, config, count=DEFAULT_RACE_COUNT, seed=0, reference=reference_engine):
+    """在單一配置上比較候選引擎與參考引擎，回傳檢驗結果與計時"""
+    camel_names = CamelRace.from_config(config).camel_names
+    ref, ref_time = _timed_run(reference, config, count, seed)
+    cand, cand_time = _timed_run(candidate, config, count, seed)
+
+    tests = []
+
+    # 獲勝者分佈
+    n = len(camel_names)
+    ref_wins = np.bincount(ref["winners"], minlength=n)
+    cand_wins = np.bincount(cand["winners"], minlength=n)
+    statistic, dof, p_value = chi2_homogeneity(ref_wins, cand_wins)
+    tests.append({"name": "獲勝者分佈", "statistic": statistic, "dof": dof, "p_value": p_value})
+
+    # 每隻駱駝的終點位置分佈
+    for i, name in enumerate(camel_names):
+        hist_ref, hist_cand = _pooled_histograms(ref["positions"][:, i], cand["positions"][:, i])
+        statistic, dof, p_value = chi2_homogeneity(hist_ref, hist_cand)
+        tests.append({"name": f"駱駝{name}終點位置", "statistic": statistic, "dof": dof, "p_value": p_value})
+
+    # 亂數序列相容時逐場比對：兩者都提供軌跡時比對完整軌跡，否則只比對終點狀態
+    exact = None
+    exact_scope = None
+    if getattr(candidate, "seed_compatible", False) and getattr(reference, "seed_compatible", False):
+        if hasattr(candidate, "trajectories") and hasattr(reference, "trajectories"):
+            exact_scope = "軌跡"
+            exact = _same_trajectories(reference, candidate, config, count, seed)
+        else:
+            exact_scope = "終點狀態"
+            exact = all(ref[key].shape == cand[key].shape and np.array_equal(ref[key], cand[key])
+                        for key in ref)
+
+    win_rate_diff = np.abs(ref_wins / max(len(ref["winners"]), 1) - cand_wins / max(len(cand["winners"]), 1))
+
+    return {
+        "races": count,
+        "tests": tests,
+        "exact": exact,
+        "exact_scope": exact_scope,
+        "max_win_rate_diff": float(win_rate_diff.max()) * 100,
+        "reference_time": ref_time,
+        "candidate_time": cand_time,
+        "speedup": ref_time / cand_time if cand_time > 0 else float("inf")
+    }
+
+def run_harness(candidate, corpus=DEFAULT_CORPUS, count=DEFAULT_RACE_COUNT, seed=0,
+                alpha=DEFAULT_ALPHA, reference=reference_engine):
+    """在整個配置集上比較候選引擎，回傳包含等價性判定與效能的報告
+
+    所有檢定以 Bonferroni 校正控制整體誤判率；可逐場比對的引擎另需結果完全一致。
+    """
+    cases = []
+    for name, config in corpus:
+        result = compare_engine(candidate, config, count, seed, reference)
+        result["name"] = name
+        cases.append(result)
+
+    test_count = sum(len(case["tests"]) for case in cases)
+    threshold = alpha / max(test_count, 1)
+    for case in cases:
+        case["passed"] = (all(test["p_value"] >= threshold for test in case["tests"])
+                          and case["exact"] is not False)
+
+    return {
+        "engine": getattr(candidate, "__name__", str(candidate)),
+        "alpha": alpha,
+        "threshold": threshold,
+        "cases": cases,
+        "passed": all(case["passed"] for case in cases)
+    }
+
+def format_report(report):
+    """將報告格式化為文字"""
+    lines = [f"引擎: {report['engine']}（α={report['alpha']}，校正後門檻 {report['threshold']:.2e}）"]
+    for case in report["cases"]:
+        min_p = min(test["p_value"] for test in case["tests"])
+        exact = {None: "不適用", True: "一致", False: "不一致"}[case["exact"]]
+        if case["exact_scope"]:
+            exact = f"{exact}（{case['exact_scope']}）"
+        lines.append(
+            f"- {case['name']}: {'通過' if case['passed'] else '未通過'}，"
+            f"最小p值 {min_p:.4f}，最大勝率差 {case['max_win_rate_diff']:.2f}%，逐場比對 {exact}，"
+            f"參考 {case['reference_time']:.2f}s / 候選 {case['candidate_time']:.2f}s"
+            f"（{case['speedup']:.2f}x）"
+        )
+    lines.append(f"結論: {'統計上等價' if report['passed'] else '與參考引擎不一致'}")
+    return "\n".join(lines)
+
+def load_engine(spec):
+    """由 "模組:函數" 字串載入候選引擎"""
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError("引擎格式必須為 模組:函數")
+    return getattr(importlib.import_module(module_name), attr)
+
+def main(argv=None):
+    """等價性檢驗的命令列入口"""
+    parser = argparse.ArgumentParser(description="比較候選模擬引擎與參考引擎的統計等價性與速度")
+    parser.add_argument("engine", help="候選引擎，格式為 模組:函數，函數簽名為 (config, count, seed)；"
+                                       "函數可附帶 seed_compatible 與 trajectories 屬性以逐場比對")
+    parser.add_argument("--count", type=int, default=DEFAULT_RACE_COUNT, help="每個配置的模擬次數")
+    parser.add_argument("--seed", type=int, default=0, help="亂數種子")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help="整體顯著水準")
+    args = parser.parse_args(argv)
+
+    report = run_harness(load_engine(args.engine), count=args.count, seed=args.seed, alpha=args.alpha)
+    print(format_report(report))
+    return 0 if report["passed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
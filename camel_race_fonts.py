@@ -0,0 +1,90 @@
+import os
+import json
+
+import matplotlib as mpl
+from matplotlib import font_manager
+
+# 獲取字體路徑函數
+def get_font_path():
+    # 優先使用打包時包含的字體
+    bundled_font = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "msjh.ttc")
+    
+    # 如果存在捆綁字體則使用
+    if os.path.exists(bundled_font):
+        return bundled_font
+    
+    # 回退到系統字體
+    system_fonts = [
+        "./fonts/msjh.ttc",  # 微軟正黑體
+        "C:/Windows/Fonts/simsun.ttc",  # 新細明體
+        "C:/Windows/Fonts/kaiu.ttf",   # 標楷體
+    ]
+    
+    for font_path in system_fonts:
+        if os.path.exists(font_path):
+            return font_path
+    
+    # 如果找不到任何字體，回傳None
+    return None
+
+# 字體解析快取檔案
+FONT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".camel_race_advanced", "font_cache.json")
+
+def resolve_chinese_font():
+    """解析中文字體路徑與字體名稱，結果快取於磁碟以加快下次啟動"""
+    font_path = get_font_path()
+    if not font_path:
+        return None, None
+        
+    font_path = os.path.abspath(font_path)
+    mtime = os.path.getmtime(font_path)
+    
+    # 讀取快取（字體檔案未變更時直接使用）
+    try:
+        with open(FONT_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get("path") == font_path and cache.get("mtime") == mtime:
+            return font_path, cache.get("name")
+    except:
+        pass
+        
+    # 讀取字體檔案取得字體名稱，只需解析一次
+    try:
+        font_name = font_manager.get_font(font_path).family_name
+    except:
+        font_name = None
+        
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_FILE), exist_ok=True)
+        with open(FONT_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({"path": font_path, "mtime": mtime, "name": font_name}, f)
+    except:
+        pass
+        
+    return font_path, font_name
+
+# 獲取字體路徑
+chinese_font_path, chinese_font_name = resolve_chinese_font()
+
+# 設定 matplotlib 中文字體
+mpl.rcParams['axes.unicode_minus'] = False
+font_families = ['Microsoft JhengHei', 'SimHei', 'Arial Unicode MS', 'sans-serif']
+
+# 如果找到了中文字體
+if chinese_font_path:
+    # 自訂字體
+    font_prop = font_manager.FontProperties(fname=chinese_font_path)
+    
+    # 只註冊選定的字體檔案，不掃描整個字體目錄
+    try:
+        font_manager.fontManager.addfont(chinese_font_path)
+        if chinese_font_name and chinese_font_name not in font_families:
+            font_families.insert(0, chinese_font_name)
+    except:
+        pass
+else:
+    font_prop = None
+    print("警告: 找不到中文字體，圖表可能無法正確顯示中文")
+    
+# 設定 matplotlib 字體
+mpl.rcParams['font.sans-serif'] = font_families
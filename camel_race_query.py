@@ -0,0 +1,201 @@
+import numpy as np
+
+from camel_race_core import collect_race_columns
+
+# 每個位元組的位元數查表（用於快速計數）
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+COMPARISON_OPERATORS = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    ">=": np.greater_equal,
+    ">": np.greater,
+    "<=": np.less_equal,
+    "<": np.less
+}
+
+class Bitmap:
+    """壓縮點陣圖：每場比賽一個位元，支援 & | ~ 組合條件"""
+
+    __slots__ = ("bits", "size")
+
+    def __init__(self, bits, size):
+        self.bits = bits
+        self.size = size
+
+    @classmethod
+    def from_mask(cls, mask):
+        """由布林陣列建立點陣圖"""
+        mask = np.asarray(mask, dtype=bool)
+        return cls(np.packbits(mask), len(mask))
+
+    @classmethod
+    def full(cls, size, value=True):
+        """建立全為 1（或全為 0）的點陣圖"""
+        return cls.from_mask(np.full(size, value, dtype=bool))
+
+    def __and__(self, other):
+        return Bitmap(self.bits & other.bits, self.size)
+
+    def __or__(self, other):
+        return Bitmap(self.bits | other.bits, self.size)
+
+    def __invert__(self):
+        # 反相後需清除最後一個位元組中超出長度的填充位元
+        bits = ~self.bits
+        padding = len(bits) * 8 - self.size
+        if padding:
+            bits[-1] &= np.uint8((0xFF << padding) & 0xFF)
+        return Bitmap(bits, self.size)
+
+    def count(self):
+        """計算為 1 的位元數"""
+        return int(_POPCOUNT[self.bits].sum(dtype=np.int64))
+
+    def to_mask(self):
+        """轉換回布林陣列"""
+        return np.unpackbits(self.bits, count=self.size).astype(bool)
+
+    def __len__(self):
+        return self.size
+
+class RaceQuery:
+    """比賽結果查詢引擎
+
+    以欄位陣列保存每場比賽的獲勝者、終點座標與起始座標，並為「獲勝者」與
+    「每隻駱駝的終點x座標」建立點陣圖索引，條件計數、條件機率與分組統計
+    只需點陣圖的位元運算。
+
+    範例：
+        q = RaceQuery.from_race(race)
+        q.probability(q.winner("A"), given=q.position("B", ">=", 14))
+        q.probability(q.ahead("C", "D"))
+        q.group_by_winner(where=q.started_on_top("E"))
+    """
+
+    def __init__(self, camel_names, winners, positions, heights, start_x=None, start_y=None):
+        """由欄位陣列建立查詢引擎（start_x/start_y 可為單一配置或逐場陣列）"""
+        self.camel_names = list(camel_names)
+        self.name_index = {name: i for i, name in enumerate(self.camel_names)}
+        self.winners = np.asarray(winners, dtype=np.int8)
+        self.positions = np.asarray(positions, dtype=np.int16)
+        self.heights = np.asarray(heights, dtype=np.int16)
+        self.size = len(self.winners)
+
+        shape = (self.size, len(self.camel_names))
+        self.start_x = np.broadcast_to(np.asarray(start_x if start_x is not None else 0, dtype=np.int16), shape)
+        self.start_y = np.broadcast_to(np.asarray(start_y if start_y is not None else 0, dtype=np.int16), shape)
+
+        self._cache = {}
+        self._build_indexes()
+
+    @classmethod
+    def from_races(cls, camel_names, races, start_x=None, start_y=None):
+        """由比賽串流（逐場紀錄或 iter_races 的 NumPy 批次）建立查詢引擎"""
+        columns = collect_race_columns(races, camel_names)
+        return cls(camel_names, columns["winners"], columns["positions"], columns["heights"],
+                   start_x, start_y)
+
+    @classmethod
+    def from_race(cls, race, races=None):
+        """由 CamelRace 的保存結果（或傳入的串流）建立查詢引擎"""
+        if races is None:
+            if not race.results:
+                raise ValueError("沒有逐場結果可供查詢")
+            races = race.results
+        return cls.from_races(race.camel_names, races, race.x_positions, race.y_positions)
+
+    def _build_indexes(self):
+        """建立獲勝者與終點位置的點陣圖索引"""
+        self.winner_index = [Bitmap.from_mask(self.winners == i) for i in range(len(self.camel_names))]
+
+        # 每隻駱駝依終點x座標排序後分組，每個座標值一個點陣圖
+        self.position_index = []
+        for i in range(len(self.camel_names)):
+            column = self.positions[:, i]
+            values = np.unique(column)
+            self.position_index.append({int(v): Bitmap.from_mask(column == v) for v in values})
+
+    def _camel(self, name):
+        """取得駱駝索引"""
+        if name not in self.name_index:
+            raise ValueError(f"找不到駱駝: {name}")
+        return self.name_index[name]
+
+    def all(self):
+        """全部比賽"""
+        return Bitmap.full(self.size)
+
+    def winner(self, name):
+        """獲勝者為指定駱駝的比賽"""
+        return self.winner_index[self._camel(name)]
+
+    def position(self, name, op, value):
+        """指定駱駝終點x座標滿足比較條件的比賽（例如 position("B", ">=", 14)）"""
+        if op not in COMPARISON_OPERATORS:
+            raise ValueError(f"不支援的比較運算: {op}")
+
+        compare = COMPARISON_OPERATORS[op]
+        result = Bitmap.full(self.size, False)
+        for v, bitmap in self.position_index[self._camel(name)].items():
+            if compare(v, value):
+                result = result | bitmap
+        return result
+
+    def ahead(self, name, rival):
+        """指定駱駝名次在對手之前的比賽（獲勝者最前，其餘依x座標、同格時在上層者較前）"""
+        key = ("ahead", name, rival)
+        if key not in self._cache:
+            i, j = self._camel(name), self._camel(rival)
+            xi, xj = self.positions[:, i], self.positions[:, j]
+            yi, yj = self.heights[:, i], self.heights[:, j]
+            # 座標完全相同時依駱駝順序決定（與獲勝者判定一致）
+            closer = (xi > xj) | ((xi == xj) & ((yi > yj) | ((yi == yj) & (i < j))))
+            mask = (self.winners == i) | ((self.winners != j) & closer)
+            self._cache[key] = Bitmap.from_mask(mask)
+        return self._cache[key]
+
+    def started_on_top(self, name):
+        """指定駱駝起始時位於堆疊最上層（且該格不只一隻駱駝）的比賽"""
+        key = ("top", name)
+        if key not in self._cache:
+            i = self._camel(name)
+            same_x = self.start_x == self.start_x[:, i:i+1]
+            stack_size = same_x.sum(axis=1)
+            top = np.where(same_x, self.start_y, 0).max(axis=1)
+            mask = (stack_size > 1) & (self.start_y[:, i] == top)
+            self._cache[key] = Bitmap.from_mask(mask)
+        return self._cache[key]
+
+    def count(self, where=None):
+        """符合條件的比賽場數"""
+        if where is None:
+            return self.size
+        return where.count()
+
+    def probability(self, event, given=None):
+        """條件機率 P(event | given)（given 為 None 時為無條件機率）"""
+        if given is not None:
+            event = event & given
+        denominator = self.count(given)
+        if denominator == 0:
+            return float("nan")
+        return event.count() / denominator
+
+    def win_probability(self, name, given=None):
+        """指定駱駝的條件獲勝機率"""
+        return self.probability(self.winner(name), given)
+
+    def group_by_winner(self, where=None):
+        """依獲勝者分組計數"""
+        counts = {}
+        for name, bitmap in zip(self.camel_names, self.winner_index):
+            counts[name] = (bitmap & where).count() if where is not None else bitmap.count()
+        return counts
+
+    def group_by_position(self, name, where=None):
+        """依指定駱駝的終點x座標分組計數"""
+        counts = {}
+        for v, bitmap in sorted(self.position_index[self._camel(name)].items()):
+            counts[v] = (bitmap & where).count() if where is not None else bitmap.count()
+        return counts
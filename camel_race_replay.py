@@ -0,0 +1,250 @@
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from matplotlib.figure import Figure
+from matplotlib.patches import Ellipse
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from camel_race_core import CAMEL_COLORS, ANIMATION_SPEED, load_race
+from camel_race_fonts import font_prop
+from camel_race_archive import HistoryArchiveReader
+
+# 重播輸出格式
+FORMAT_GIF = "gif"
+FORMAT_PNG = "png"  # 每場比賽一個資料夾，每一步一張圖片
+OUTPUT_FORMATS = (FORMAT_GIF, FORMAT_PNG)
+
+DEFAULT_WIDTH = 800
+DEFAULT_HEIGHT = 400
+TRACK_ROWS = 8  # 與 TrackVisualizer 相同的垂直格數
+PALETTE_COLORS = 64  # GIF 共用調色盤的顏色數
+
+class ReplayRenderer:
+    """無介面的比賽重播繪製器
+
+    版面與 TrackVisualizer 相同（格線、刻度、終點線與駱駝橢圓）。圖表與所有
+    圖形物件只建立一次：靜態的賽道背景先繪製並保存，每一幀只還原背景、
+    移動駱駝圖形並重繪這幾個物件，因此大量重播時不需重新建立圖表。
+    """
+
+    def __init__(self, camel_names, track_length, colors=None, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+        """建立圖表、賽道背景與駱駝圖形"""
+        if track_length < 1:
+            raise ValueError("賽道長度必須至少為1")
+        self.camel_names = list(camel_names)
+        self.track_length = track_length
+        self.colors = list(colors or CAMEL_COLORS)
+        self.width = width
+        self.height = height
+
+        self.grid_width = width / (track_length + 1)
+        self.grid_height = height / TRACK_ROWS
+        self.camel_width = self.grid_width * 0.8
+        self.camel_height = self.grid_height * 0.7
+
+        # 以像素為座標、y軸向下，與 Tk 畫布一致
+        self.figure = Figure(figsize=(width / 100, height / 100), dpi=100)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_axes([0, 0, 1, 1])
+        self.axes.set_xlim(0, width)
+        self.axes.set_ylim(height, 0)
+        self.axes.axis('off')
+
+        self._draw_track()
+
+        self.camel_artists = {}
+        for i, name in enumerate(self.camel_names):
+            color = self.colors[i] if i < len(self.colors) else "#000000"
+            body = Ellipse((0, 0), self.camel_width, self.camel_height,
+                           facecolor=color, edgecolor='black', animated=True)
+            label = self.axes.text(0, 0, name, color='white', fontsize=12, fontweight='bold',
+                                   ha='center', va='center', animated=True)
+            self.axes.add_patch(body)
+            self.camel_artists[name] = (body, label)
+
+        # 繪製一次靜態背景並保存
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._palette = None
+
+    def _draw_track(self):
+        """繪製賽道格線、刻度與終點線"""
+        for i in range(self.track_length + 2):
+            x = i * self.grid_width
+            self.axes.plot([x, x], [0, self.height], color='#E0E0E0', linewidth=1)
+            if i > 0:
+                self.axes.text(x - self.grid_width / 2, self.height - 10, str(i),
+                               color='#888', ha='center', va='center', fontsize=9)
+
+        finish_x = self.track_length * self.grid_width
+        self.axes.plot([finish_x, finish_x], [0, self.height], color='red', linewidth=2, linestyle=(0, (5, 3)))
+        self.axes.text(finish_x + 5, 20, "終點", color='red', ha='left', va='center',
+                       fontsize=12, fontweight='bold', fontproperties=font_prop)
+
+    def render_frame(self, state):
+        """繪製一個狀態（[[名稱, x, y], ...]），回傳 RGBA 影像"""
+        from PIL import Image
+
+        self.canvas.restore_region(self.background)
+        for name, x, y in state:
+            body, label = self.camel_artists[name]
+            center_x = x * self.grid_width - self.grid_width / 2
+            center_y = self.height - (y + 1) * self.grid_height + self.camel_height / 2
+            body.set_center((center_x, center_y))
+            label.set_position((center_x, center_y))
+            self.axes.draw_artist(body)
+            self.axes.draw_artist(label)
+
+        width, height = self.canvas.get_width_height()
+        return Image.frombuffer("RGBA", (width, height), self.canvas.buffer_rgba(), "raw", "RGBA", 0, 1).copy()
+
+    def palette(self):
+        """所有GIF共用的調色盤（由賽道背景與全部駱駝產生），避免每一幀重新量化"""
+        if self._palette is None:
+            from PIL import Image
+            sample = [[name, i + 1, 1] for i, name in enumerate(self.camel_names)]
+            self._palette = self.render_frame(sample).convert("RGB").quantize(
+                colors=PALETTE_COLORS, method=Image.Quantize.MEDIANCUT)
+        return self._palette
+
+    def render(self, history, output, output_format=FORMAT_GIF, frame_duration=ANIMATION_SPEED):
+        """將一場比賽的狀態列表輸出為GIF動畫或圖片序列，回傳輸出路徑"""
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支援的輸出格式: {output_format}")
+
+        if output_format == FORMAT_PNG:
+            os.makedirs(output, exist_ok=True)
+            for step, state in enumerate(history):
+                self.render_frame(state).save(os.path.join(output, f"frame_{step:04d}.png"))
+            return output
+
+        from PIL import Image
+        palette = self.palette()
+        frames = [self.render_frame(state).convert("RGB").quantize(palette=palette, dither=Image.Dither.NONE)
+                  for state in history]
+        # 最後一幀停留較久，方便看清終點位置
+        durations = [frame_duration] * (len(frames) - 1) + [frame_duration * 20]
+        frames[0].save(output, save_all=True, append_images=frames[1:], duration=durations, loop=0, optimize=False)
+        return output
+
+# 工作程序中的繪製器快取（依駱駝名稱、賽道長度與尺寸重複使用）
+_renderers = {}
+
+def _get_renderer(camel_names, track_length, colors, width, height):
+    """取得（或建立）工作程序中的繪製器"""
+    key = (tuple(camel_names), track_length, tuple(colors or ()), width, height)
+    if key not in _renderers:
+        _renderers[key] = ReplayRenderer(camel_names, track_length, colors, width, height)
+    return _renderers[key]
+
+def _output_path(output_dir, number, output_format):
+    """第 number 場重播的輸出路徑"""
+    name = f"race_{number:05d}"
+    return os.path.join(output_dir, name + ".gif" if output_format == FORMAT_GIF else name)
+
+def _render_history_job(history, track_length, colors, output, output_format, width, height):
+    """在工作程序中繪製一場比賽"""
+    camel_names = sorted(name for name, _, _ in history[0])
+    renderer = _get_renderer(camel_names, track_length, colors, width, height)
+    return renderer.render(history, output, output_format)
+
+def _record_track_length(metadata, number, track_length=None):
+    """取得紀錄的賽道長度（呼叫端指定時優先使用），缺少或無效時拋出錯誤"""
+    if track_length is None:
+        track_length = metadata.get("track_length")
+    if not isinstance(track_length, int) or track_length < 1:
+        raise ValueError(f"第{number}場比賽缺少有效的賽道長度，請以 track_length 指定")
+    return track_length
+
+def _render_archive_job(filename, numbers, output_dir, output_format, colors, width, height, track_length=None):
+    """在工作程序中繪製封存檔中的一批比賽（各程序自行開啟封存檔）"""
+    outputs = []
+    with HistoryArchiveReader(filename) as reader:
+        for number in numbers:
+            history, metadata = reader.read_record(number)
+            output = _output_path(output_dir, number, output_format)
+            outputs.append(_render_history_job(history, _record_track_length(metadata, number, track_length),
+                                               colors, output, output_format, width, height))
+    return outputs
+
+def _chunks(items, count):
+    """將列表平均切成 count 份"""
+    size = max(1, -(-len(items) // max(count, 1)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def render_replays(histories, track_length, output_dir, output_format=FORMAT_GIF, workers=None,
+                   colors=None, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+    """平行繪製多場比賽的重播，回傳依輸入順序排列的輸出路徑"""
+    os.makedirs(output_dir, exist_ok=True)
+    histories = list(histories)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_history_job, history, track_length, colors,
+                               _output_path(output_dir, number, output_format), output_format, width, height)
+                   for number, history in enumerate(histories)]
+        return [future.result() for future in futures]
+
+def render_archive(filename, output_dir, numbers=None, output_format=FORMAT_GIF, workers=None,
+                   colors=None, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, track_length=None):
+    """平行繪製比賽歷史封存檔中的比賽（numbers 為 None 時繪製全部）
+
+    track_length 為 None 時使用每筆紀錄中保存的賽道長度；紀錄缺少有效長度時
+    在開始繪製前拋出 ValueError。
+    """
+    with HistoryArchiveReader(filename) as reader:
+        if numbers is None:
+            numbers = list(range(len(reader)))
+        # 先檢查所有紀錄的賽道長度（只讀取中繼資料），避免在工作程序中途失敗或輸出錯誤的畫面
+        for number in numbers:
+            _record_track_length(reader.read_metadata(number), number, track_length)
+    os.makedirs(output_dir, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    outputs = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 每個工作程序處理一批比賽，只需傳遞編號
+        futures = [pool.submit(_render_archive_job, filename, chunk, output_dir, output_format,
+                               colors, width, height, track_length)
+                   for chunk in _chunks(list(numbers), workers * 4)]
+        for future in futures:
+            outputs.extend(future.result())
+    return outputs
+
+def main(argv=None):
+    """批次重播繪製的命令列入口"""
+    parser = argparse.ArgumentParser(description="將比賽歷史批次輸出為GIF動畫或圖片序列")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--archive", help="比賽歷史封存檔")
+    source.add_argument("--config", help="save_configuration 格式的配置檔（模擬新的比賽後繪製）")
+    parser.add_argument("--count", type=int, default=10, help="使用 --config 時模擬的比賽場數")
+    parser.add_argument("--seed", type=int, default=None, help="使用 --config 時的亂數種子")
+    parser.add_argument("--races", type=int, nargs="*", default=None, help="只繪製封存檔中指定編號的比賽")
+    parser.add_argument("--track-length", type=int, default=None, help="覆寫封存檔紀錄中的賽道長度")
+    parser.add_argument("--output", required=True, help="輸出資料夾")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default=FORMAT_GIF, help="輸出格式")
+    parser.add_argument("--workers", type=int, default=None, help="平行程序數量")
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH, help="圖片寬度（像素）")
+    parser.add_argument("--height", type=int, default=DEFAULT_HEIGHT, help="圖片高度（像素）")
+    args = parser.parse_args(argv)
+
+    if args.archive:
+        try:
+            outputs = render_archive(args.archive, args.output, args.races, args.format, args.workers,
+                                     width=args.width, height=args.height, track_length=args.track_length)
+        except ValueError as e:
+            print(f"無法繪製: {e}")
+            return 1
+    else:
+        race = load_race(args.config, args.seed)
+        if race is None:
+            return 1
+        histories = [race.simulate_one_race()["history"] for _ in range(args.count)]
+        outputs = render_replays(histories, race.track_length, args.output, args.format, args.workers,
+                                 race.colors, args.width, args.height)
+
+    print(f"已輸出 {len(outputs)} 場重播至 {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,433 @@
+import sys
+import math
+import argparse
+import itertools
+
+import numpy as np
+
+from camel_race_core import print_progress, load_race
+
+# 分層抽樣預設參數
+DEFAULT_SAMPLE_COUNT = 10000
+MAX_STRATIFY_DEPTH = 2
+MIN_STRATUM_SIZE = 2  # 每層至少的場數（估計層內變異數所需）
+
+# 重要性抽樣預設參數
+DEFAULT_IMPORTANCE_COUNT = 20000
+DEFAULT_PILOT_COUNT = 2000  # 每輪交叉熵調整的試跑場數
+DEFAULT_CE_ITERATIONS = 6
+ELITE_RATIO = 0.1  # 每輪取分數最高的比例更新抽樣分佈
+CE_SMOOTHING = 0.7  # 新舊抽樣分佈的混合比例
+MIN_PROBABILITY_RATIO = 0.06  # 抽樣分佈中每個選項的最低機率（相對於均勻分佈的比例）
+DEFENSIVE_MIXTURE = 0.05  # 以原始分佈抽樣的比例（限制權重上限為其倒數）
+PROPOSAL_ROUNDS = 6  # 各回合分別學習點數分佈的回合數（之後的回合沿用最後一組）
+MAX_ROUNDS = 100  # 與 simulate_one_race 的回合上限相同
+MIN_TARGET_EFFECTIVE = 50  # 命中樣本的有效樣本數下限（低於此值表示估計由少數權重主導）
+MAX_WEIGHT_SHARE = 0.1  # 單一命中樣本權重佔命中權重總和的上限
+
+def stratum_count(camel_count, depth, face_count):
+    """移動順序與前 depth 回合骰子組合的層數（face_count 為骰子的面數）"""
+    return math.factorial(camel_count) * face_count ** (camel_count * depth)
+
+def choose_depth(camel_count, count, face_count, max_depth=MAX_STRATIFY_DEPTH):
+    """選擇在指定模擬次數下每層仍有足夠場數的最深分層回合數"""
+    for depth in range(max_depth, -1, -1):
+        if stratum_count(camel_count, depth, face_count) * MIN_STRATUM_SIZE <= count:
+            return depth
+    raise ValueError(f"模擬次數至少需要 {stratum_count(camel_count, 0, face_count) * MIN_STRATUM_SIZE} 次才能分層抽樣")
+
+def decode_stratum(index, orders, camel_count, depth, dice_faces):
+    """將層編號轉換為 (移動順序, 前 depth 回合的骰子點數)"""
+    order = orders[index % len(orders)]
+    rest = index // len(orders)
+    dice = []
+    for _ in range(depth):
+        row = []
+        for _ in range(camel_count):
+            rest, face = divmod(rest, len(dice_faces))
+            row.append(dice_faces[face])
+        dice.append(row)
+    return order, dice
+
+def allocate_strata(race, count, strata):
+    """將模擬次數平均分配到每一層（餘數隨機分配），回傳每場比賽的層編號"""
+    base, remainder = divmod(count, strata)
+    extra = np.array(sorted(race.rng.sample(range(strata), remainder)), dtype=np.int64)
+    return np.concatenate([np.repeat(np.arange(strata, dtype=np.int64), base), extra])
+
+def stratified_estimate(strata, values, stratum_total):
+    """計算分層估計值
+
+    values 為 (場數, 指標數) 的陣列；每層機率相同，因此估計值為各層平均的平均。
+    回傳 (估計值, 分層估計的變異數, 相同場數下一般蒙地卡羅的變異數)。
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(strata)
+    counts = np.bincount(strata, minlength=stratum_total).astype(float)
+    weight = 1.0 / stratum_total
+
+    estimates = np.empty(values.shape[1])
+    strat_var = np.empty(values.shape[1])
+    plain_var = np.empty(values.shape[1])
+    for k in range(values.shape[1]):
+        sums = np.bincount(strata, weights=values[:, k], minlength=stratum_total)
+        squares = np.bincount(strata, weights=values[:, k] ** 2, minlength=stratum_total)
+        means = sums / counts
+        within = np.maximum(squares - counts * means ** 2, 0.0) / (counts - 1)
+
+        estimates[k] = weight * means.sum()
+        strat_var[k] = (weight ** 2 * within / counts).sum()
+        # 母體變異數 = 層內變異數 + 層間變異數
+        plain_var[k] = weight * (within + (means - estimates[k]) ** 2).sum() / n
+    return estimates, strat_var, plain_var
+
+def _variance_ratio(plain, stratified):
+    """變異數縮減倍數（一般蒙地卡羅變異數 / 分層變異數）"""
+    if stratified > 0:
+        return float(plain / stratified)
+    return float("inf") if plain > 0 else 1.0
+
+def stratified_analysis(race, count=DEFAULT_SAMPLE_COUNT, depth=None, progress_callback=None):
+    """以分層抽樣模擬並分析結果
+
+    依「移動順序 × 前 depth 回合骰子點數」分層，每層場數相同，估計值依層權重合併；
+    骰子的每一面各自成層（重複的面代表較高的機率），每回合重新抽選順序的規則下
+    只以第一回合的順序分層。depth 為 None 時自動選擇每層至少 MIN_STRATUM_SIZE 場的最深層數。
+    回傳與 analyze_results 相同格式的分析結果，另外包含標準誤與變異數縮減倍數。
+    """
+    camel_count = race.camel_count
+    dice_faces = race.compiled_rules().dice_faces
+    if depth is None:
+        depth = choose_depth(camel_count, count, len(dice_faces))
+    total = stratum_count(camel_count, depth, len(dice_faces))
+    if total * MIN_STRATUM_SIZE > count:
+        raise ValueError(f"分層 {depth} 回合時模擬次數至少需要 {total * MIN_STRATUM_SIZE} 次")
+
+    orders = list(itertools.permutations(range(camel_count)))
+    strata = allocate_strata(race, count, total)
+    name_index = {name: i for i, name in enumerate(race.camel_names)}
+
+    # 每場比賽的指標：各駱駝是否獲勝、各駱駝終點x座標
+    values = np.zeros((count, 2 * camel_count))
+    for i, stratum in enumerate(strata):
+        order, dice = decode_stratum(int(stratum), orders, camel_count, depth, dice_faces)
+        result = race.simulate_one_race(record_history=False, order=order, dice=dice)
+        values[i, name_index[result["winner"]]] = 1.0
+        for j, camel in enumerate(result["final_positions"]):
+            values[i, camel_count + j] = camel[1]
+
+        if progress_callback and (i + 1) % 100 == 0:
+            progress_callback(i + 1, count)
+
+    estimates, strat_var, plain_var = stratified_estimate(strata, values, total)
+    win = slice(0, camel_count)
+    pos = slice(camel_count, 2 * camel_count)
+
+    win_rates = {name: float(estimates[i]) * 100 for i, name in enumerate(race.camel_names)}
+    win_std_errors = {name: float(math.sqrt(strat_var[i])) * 100 for i, name in enumerate(race.camel_names)}
+    win_reduction = {name: _variance_ratio(plain_var[i], strat_var[i]) for i, name in enumerate(race.camel_names)}
+
+    if progress_callback:
+        progress_callback(count, count)
+
+    return {
+        "win_rates": win_rates,
+        "avg_positions": estimates[pos],
+        "std_positions": np.sqrt(plain_var[pos] * count),
+        "ranking": sorted(win_rates.items(), key=lambda x: x[1], reverse=True),
+        "total_races": count,
+        "depth": depth,
+        "strata": total,
+        "win_rate_std_errors": win_std_errors,
+        "variance_reduction": win_reduction,
+        "position_variance_reduction": [_variance_ratio(p, s) for p, s in zip(plain_var[pos], strat_var[pos])],
+        "overall_variance_reduction": _variance_ratio(plain_var[win].sum(), strat_var[win].sum())
+    }
+
+def format_stratified_report(race, analysis):
+    """將分層抽樣結果格式化為文字"""
+    lines = [f"分層抽樣: {analysis['total_races']} 場，"
+             f"依移動順序與前 {analysis['depth']} 回合骰子分為 {analysis['strata']} 層"]
+    for name, rate in analysis["ranking"]:
+        lines.append(
+            f"駱駝{name}: 勝率 {rate:.2f}% ± {analysis['win_rate_std_errors'][name]:.2f}%，"
+            f"變異數縮減 {analysis['variance_reduction'][name]:.2f}x"
+        )
+    for i, name in enumerate(race.camel_names):
+        lines.append(
+            f"駱駝{name}: 平均終點位置 {analysis['avg_positions'][i]:.2f}，"
+            f"變異數縮減 {analysis['position_variance_reduction'][i]:.2f}x"
+        )
+    lines.append(f"整體勝率變異數縮減 {analysis['overall_variance_reduction']:.2f}x"
+                 f"（相當於一般蒙地卡羅 {analysis['overall_variance_reduction'] * analysis['total_races']:.0f} 場）")
+    return "\n".join(lines)
+
+class _ProposalDice:
+    """逐回合抽取骰子點數，並累計抽樣分佈相對於均勻骰子的對數機率比 log(q/p)
+
+    作為 simulate_one_race 的 dice 參數使用，只有實際進行的回合才會抽樣。
+    nominal 為 True 時依原始的均勻分佈抽樣，但仍累計同樣的機率比。
+    """
+
+    def __init__(self, rng, dice_faces, slot_probabilities, nominal=False):
+        self.rng = rng
+        self.dice_faces = dice_faces
+        self.slot_probabilities = slot_probabilities  # [移動順位][回合][骰子面]
+        self.nominal = nominal
+        self.log_ratio = 0.0
+        self.face_counts = np.zeros((len(slot_probabilities), PROPOSAL_ROUNDS, len(dice_faces)))
+        self._uniform = math.log(1.0 / len(dice_faces))
+
+    def __len__(self):
+        return MAX_ROUNDS
+
+    def __getitem__(self, round_index):
+        row = []
+        stage = min(round_index, PROPOSAL_ROUNDS - 1)
+        for slot, camel_probabilities in enumerate(self.slot_probabilities):
+            probabilities = camel_probabilities[stage]
+            if self.nominal:
+                face = self.rng.randrange(len(self.dice_faces))
+            else:
+                face = self.rng.choices(range(len(self.dice_faces)), weights=probabilities)[0]
+            self.log_ratio += math.log(probabilities[face]) - self._uniform
+            self.face_counts[slot, stage, face] += 1
+            row.append(self.dice_faces[face])
+        return row
+
+def _race_score(result, target):
+    """目標駱駝離獲勝的距離（獲勝為 1，否則為落後領先者的格數取負值）"""
+    if result["winner"] == target:
+        return 1.0
+    positions = {camel[0]: camel[1] for camel in result["final_positions"]}
+    leader = max(x for name, x in positions.items() if name != target)
+    return float(min(positions[target] - leader, 0))
+
+def _importance_run(race, target, count, face_probabilities, order_probabilities, record_draws=False,
+                    progress_callback=None):
+    """以防禦性混合分佈模擬
+
+    每場比賽以 DEFENSIVE_MIXTURE 的機率依原始分佈進行、否則依抽樣分佈進行，
+    權重為 p / (α·p + (1-α)·q)，因此不會超過 1/α，避免少數極端權重主導估計值。
+    回傳 (權重, 獲勝者索引, 分數, 每隻駱駝的點數計數, 移動順序編號)；
+    點數計數與移動順序只在 record_draws 為 True 時記錄（用於調整抽樣分佈）。
+    """
+    camel_count = race.camel_count
+    dice_faces = race.compiled_rules().dice_faces
+    name_index = {name: i for i, name in enumerate(race.camel_names)}
+    target_name = race.camel_names[target]
+    orders = list(itertools.permutations(range(camel_count)))
+
+    weights = np.empty(count)
+    winners = np.empty(count, dtype=np.int64)
+    scores = np.empty(count)
+    face_counts = np.zeros((count, camel_count, PROPOSAL_ROUNDS, len(dice_faces))) if record_draws else None
+    order_indexes = np.empty(count, dtype=np.int64) if record_draws else None
+    for i in range(count):
+        nominal = race.rng.random() < DEFENSIVE_MIXTURE
+
+        if nominal:
+            order_index = race.rng.randrange(len(orders))
+        else:
+            order_index = race.rng.choices(range(len(orders)), weights=order_probabilities)[0]
+        order = orders[order_index]
+
+        dice = _ProposalDice(race.rng, dice_faces, [face_probabilities[camel] for camel in order], nominal)
+        result = race.simulate_one_race(record_history=False, order=order, dice=dice)
+
+        log_ratio = math.log(order_probabilities[order_index] * len(orders)) + dice.log_ratio
+        weights[i] = 1.0 / (DEFENSIVE_MIXTURE + (1 - DEFENSIVE_MIXTURE) * math.exp(log_ratio))
+        winners[i] = name_index[result["winner"]]
+        scores[i] = _race_score(result, target_name)
+        if record_draws:
+            for position, camel in enumerate(order):
+                face_counts[i, camel] = dice.face_counts[position]
+            order_indexes[i] = order_index
+
+        if progress_callback and (i + 1) % 100 == 0:
+            progress_callback(i + 1, count)
+    return weights, winners, scores, face_counts, order_indexes
+
+def _normalize(probabilities):
+    """設定最低機率（相對於均勻分佈）後重新正規化"""
+    probabilities = np.maximum(probabilities, MIN_PROBABILITY_RATIO / probabilities.shape[-1])
+    return probabilities / probabilities.sum(axis=-1, keepdims=True)
+
+def fit_proposal(race, target, pilot_count=DEFAULT_PILOT_COUNT, iterations=DEFAULT_CE_ITERATIONS):
+    """以交叉熵法調整抽樣分佈，使目標駱駝獲勝的比賽更常出現
+
+    每輪取分數最高的 ELITE_RATIO 場（或全部獲勝場），以似然比加權的點數與移動順序
+    頻率作為新的抽樣分佈。回傳 (每隻駱駝各回合的點數分佈, 移動順序分佈)。
+    """
+    camel_count = race.camel_count
+    face_count = len(race.compiled_rules().dice_faces)
+    face_probabilities = np.full((camel_count, PROPOSAL_ROUNDS, face_count), 1.0 / face_count)
+    order_count = math.factorial(camel_count)
+    order_probabilities = np.full(order_count, 1.0 / order_count)
+
+    for _ in range(iterations):
+        weights, _, scores, face_counts, order_indexes = _importance_run(
+            race, target, pilot_count, face_probabilities, order_probabilities, record_draws=True)
+
+        # 菁英門檻：獲勝場夠多時只用獲勝場，否則逐輪提高分數門檻
+        threshold = min(np.quantile(scores, 1 - ELITE_RATIO), 1.0)
+        elite = scores >= threshold
+        elite_weights = weights * elite
+        if elite_weights.sum() <= 0:
+            continue
+
+        faces = np.tensordot(elite_weights, face_counts, axes=1)
+        totals = faces.sum(axis=2, keepdims=True)
+        # 菁英場中沒有進行到的回合保留原本的分佈
+        new_faces = np.where(totals > 0, _normalize(faces / np.maximum(totals, 1e-12)), face_probabilities)
+        new_orders = _normalize(np.bincount(order_indexes, weights=elite_weights, minlength=order_count)
+                                / elite_weights.sum())
+
+        face_probabilities = CE_SMOOTHING * new_faces + (1 - CE_SMOOTHING) * face_probabilities
+        order_probabilities = CE_SMOOTHING * new_orders + (1 - CE_SMOOTHING) * order_probabilities
+
+    return face_probabilities, order_probabilities
+
+def _plain_estimate(race, target, count):
+    """以一般蒙地卡羅估計目標駱駝的獲勝機率（權重診斷未通過時的備援）"""
+    analysis = race.analyze_results(race.iter_races(count))
+    win_probabilities = {name: rate / 100 for name, rate in analysis["win_rates"].items()}
+    probability = win_probabilities[race.camel_names[target]]
+    hits = int(round(probability * count))
+    std_error = math.sqrt(probability * (1 - probability) / count)
+    return probability, std_error, hits, win_probabilities
+
+def importance_sampling(race, target, count=DEFAULT_IMPORTANCE_COUNT, pilot_count=DEFAULT_PILOT_COUNT,
+                        iterations=DEFAULT_CE_ITERATIONS, progress_callback=None):
+    """以重要性抽樣估計指定駱駝的獲勝機率
+
+    先以交叉熵法學習偏向目標駱駝獲勝的骰子點數與移動順序分佈，再以該分佈
+    （混入少量原始分佈）模擬；每場比賽以似然比加權，因此估計值不偏。
+    回傳獲勝機率、標準誤、有效樣本數，以及一般蒙地卡羅達到相同精度所需的場數。
+
+    抽樣分佈可能完全錯過目標駱駝某些獲勝的方式，此時估計值偏低而標準誤仍然很小。
+    命中樣本的有效樣本數低於 MIN_TARGET_EFFECTIVE、或單一權重佔命中權重超過
+    MAX_WEIGHT_SHARE 時，改以相同場數的一般蒙地卡羅估計，並將 "reliable" 設為 False。
+    """
+    if target not in race.camel_names:
+        raise ValueError(f"找不到駱駝: {target}")
+    target_index = race.camel_names.index(target)
+
+    face_probabilities, order_probabilities = fit_proposal(race, target_index, pilot_count, iterations)
+    weights, winners, _, _, _ = _importance_run(race, target_index, count, face_probabilities,
+                                                order_probabilities, progress_callback=progress_callback)
+    hits = winners == target_index
+    values = weights * hits
+
+    probability = float(values.mean())
+    std_error = float(values.std(ddof=1) / math.sqrt(count)) if count > 1 else float("inf")
+    effective = float(weights.sum() ** 2 / (weights ** 2).sum())
+    hit_weights = weights[hits]
+    target_effective = float(hit_weights.sum() ** 2 / (hit_weights ** 2).sum()) if hits.any() else 0.0
+    max_weight_share = float(hit_weights.max() / hit_weights.sum()) if hits.any() else 1.0
+    hit_count = int(hits.sum())
+
+    # 所有駱駝的獲勝機率也可由同一組加權樣本不偏估計
+    win_probabilities = {name: float((weights * (winners == i)).mean())
+                         for i, name in enumerate(race.camel_names)}
+
+    reliable = target_effective >= MIN_TARGET_EFFECTIVE and max_weight_share <= MAX_WEIGHT_SHARE
+    fallback_races = 0
+    if reliable:
+        plain_races = (probability * (1 - probability) / std_error ** 2) if std_error > 0 else float("inf")
+    else:
+        # 權重診斷未通過：重要性抽樣的估計值與標準誤都不可信，改用一般蒙地卡羅
+        probability, std_error, hit_count, win_probabilities = _plain_estimate(race, target_index, count)
+        effective = float(count)
+        plain_races = float(count)
+        fallback_races = count
+
+    if progress_callback:
+        progress_callback(count, count)
+
+    return {
+        "target": target,
+        "method": "importance" if reliable else "plain",
+        "reliable": reliable,
+        "probability": probability,
+        "std_error": std_error,
+        "relative_error": std_error / probability if probability > 0 else float("inf"),
+        "effective_sample_size": effective,
+        "target_effective_sample_size": target_effective,
+        "max_weight_share": max_weight_share,
+        "hits": hit_count,
+        "total_races": count,
+        "pilot_races": pilot_count * iterations,
+        "fallback_races": fallback_races,
+        "dice_probabilities": {name: face_probabilities[i].tolist() for i, name in enumerate(race.camel_names)},
+        "win_probabilities": win_probabilities,
+        "equivalent_plain_races": plain_races
+    }
+
+def format_importance_report(result):
+    """將重要性抽樣結果格式化為文字"""
+    total = result["total_races"] + result["pilot_races"] + result["fallback_races"]
+    diagnostic = (f"命中樣本有效樣本數 {result['target_effective_sample_size']:.0f}，"
+                  f"最大權重佔命中權重 {result['max_weight_share'] * 100:.1f}%")
+    if not result["reliable"]:
+        lines = [
+            f"重要性抽樣的權重診斷未通過（{diagnostic}），抽樣分佈可能錯過部分獲勝方式",
+            f"改以一般蒙地卡羅模擬 {result['total_races']} 場，結果不可靠，僅供參考",
+            f"駱駝{result['target']}: 獲勝機率 {result['probability'] * 100:.4f}% ± {result['std_error'] * 100:.4f}%"
+            f"（命中 {result['hits']} 場）"
+        ]
+        if result["hits"] == 0:
+            lines.append(f"未命中任何一場，95%信賴上限約 {3 / result['total_races'] * 100:.4f}%")
+        return "\n".join(lines)
+    return "\n".join([
+        f"重要性抽樣: {result['total_races']} 場（另有 {result['pilot_races']} 場用於調整抽樣分佈）",
+        f"駱駝{result['target']}: 獲勝機率 {result['probability'] * 100:.4f}% ± {result['std_error'] * 100:.4f}%"
+        f"（相對誤差 {result['relative_error'] * 100:.1f}%）",
+        f"命中 {result['hits']} 場，有效樣本數 {result['effective_sample_size']:.0f}（{diagnostic}）",
+        f"一般蒙地卡羅需約 {result['equivalent_plain_races']:.0f} 場才能達到相同精度"
+        f"（含調整場數為 {result['equivalent_plain_races'] / total:.1f}x）"
+    ])
+
+def main(argv=None):
+    """抽樣模擬的命令列入口"""
+    parser = argparse.ArgumentParser(description="駱駝競速變異數縮減抽樣")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stratified_parser = subparsers.add_parser("stratified", help="依移動順序與骰子點數分層抽樣")
+    stratified_parser.add_argument("--config", required=True, help="save_configuration 格式的配置檔")
+    stratified_parser.add_argument("--count", type=int, default=DEFAULT_SAMPLE_COUNT, help="模擬次數")
+    stratified_parser.add_argument("--depth", type=int, default=None, help="分層的骰子回合數（預設自動選擇）")
+    stratified_parser.add_argument("--seed", type=int, default=None, help="亂數種子")
+
+    importance_parser = subparsers.add_parser("importance", help="以重要性抽樣估計冷門駱駝的獲勝機率")
+    importance_parser.add_argument("--config", required=True, help="save_configuration 格式的配置檔")
+    importance_parser.add_argument("--camel", required=True, help="目標駱駝名稱")
+    importance_parser.add_argument("--count", type=int, default=DEFAULT_IMPORTANCE_COUNT, help="模擬次數")
+    importance_parser.add_argument("--pilot-count", type=int, default=DEFAULT_PILOT_COUNT, help="每輪調整抽樣分佈的試跑場數")
+    importance_parser.add_argument("--iterations", type=int, default=DEFAULT_CE_ITERATIONS, help="調整抽樣分佈的輪數")
+    importance_parser.add_argument("--seed", type=int, default=None, help="亂數種子")
+
+    args = parser.parse_args(argv)
+
+    race = load_race(args.config, args.seed)
+    if race is None:
+        return 1
+
+    try:
+        if args.command == "importance":
+            result = importance_sampling(race, args.camel, args.count, args.pilot_count,
+                                         args.iterations, print_progress)
+            report = format_importance_report(result)
+        else:
+            analysis = stratified_analysis(race, args.count, args.depth, print_progress)
+            report = format_stratified_report(race, analysis)
+    except ValueError as e:
+        print(str(e))
+        return 1
+
+    print()
+    print(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
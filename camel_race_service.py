@@ -0,0 +1,393 @@
+import json
+import time
+import queue
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from camel_race_core import CamelRace, RaceStats, DEFAULT_SIMULATION_COUNT, simulate_shard
+
+# 服務預設參數
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_BATCH_WINDOW = 0.02  # 秒
+DEFAULT_CACHE_SIZE = 128
+DEFAULT_SHARD_SIZE = 2000
+MAX_SIMULATION_COUNT = 1000000
+MAX_TRACK_LENGTH = 255  # 每個工作程序的規則查表大小與賽道長度成正比
+
+def _warm_worker():
+    """預熱工作程序（匯入模組並執行一場比賽）"""
+    CamelRace().simulate_one_race()
+
+def analysis_to_json(analysis):
+    """將分析結果轉換為可序列化的格式"""
+    return {
+        "win_rates": analysis["win_rates"],
+        "avg_positions": [float(v) for v in analysis["avg_positions"]],
+        "std_positions": [float(v) for v in analysis["std_positions"]],
+        "ranking": [[name, rate] for name, rate in analysis["ranking"]],
+        "total_races": analysis["total_races"]
+    }
+
+def normalize_config(config):
+    """檢查並正規化 save_configuration 格式的配置"""
+    if not isinstance(config, dict):
+        raise ValueError("配置必須是JSON物件")
+
+    race = CamelRace.from_config(config)
+    if race.camel_count < 1 or race.camel_count > 26:
+        raise ValueError("駱駝數量必須介於1到26之間")
+    if len(race.x_positions) != race.camel_count or len(race.y_positions) != race.camel_count:
+        raise ValueError("座標數量與駱駝數量不符")
+    if not isinstance(race.track_length, int) or not 2 <= race.track_length <= MAX_TRACK_LENGTH:
+        raise ValueError(f"賽道長度必須是介於2到{MAX_TRACK_LENGTH}之間的整數")
+
+    valid, error_msg = race.validate_positions()
+    if not valid:
+        raise ValueError(error_msg)
+
+    # 顏色不影響模擬結果，不列入快取鍵
+    return {
+        "camel_count": race.camel_count,
+        "track_length": race.track_length,
+        "x_positions": [int(x) for x in race.x_positions],
+        "y_positions": [int(y) for y in race.y_positions],
+        "rules": race.rules.to_dict()
+    }
+
+def config_key(config, count):
+    """計算配置與模擬次數的快取鍵"""
+    payload = json.dumps([config, count], sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class _PendingRequest:
+    """等待批次處理的請求"""
+
+    def __init__(self, key, config, count):
+        self.key = key
+        self.config = config
+        self.count = count
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class _BatchJob:
+    """同一配置的合併工作（可能拆成多個分片）"""
+
+    def __init__(self, service, requests, shard_count):
+        self.service = service
+        self.requests = requests
+        self.remaining = shard_count
+        self.stats = RaceStats(CamelRace.from_config(requests[0].config).camel_names)
+        self.error = None
+        self.lock = threading.Lock()
+
+    def on_shard_done(self, future):
+        """分片完成回調"""
+        with self.lock:
+            try:
+                self.stats.merge(RaceStats.from_dict(future.result()))
+            except Exception as e:
+                self.error = e
+            self.remaining -= 1
+            finished = self.remaining == 0
+
+        if finished:
+            self.service._finish_job(self)
+
+class ServiceMetrics:
+    """服務吞吐量與延遲統計"""
+
+    def __init__(self, window=1000):
+        self.started_at = time.time()
+        self.requests = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.races_simulated = 0
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record_request(self, latency, cache_hit=False, error=False):
+        """記錄一次請求"""
+        with self.lock:
+            self.requests += 1
+            if cache_hit:
+                self.cache_hits += 1
+            if error:
+                self.errors += 1
+            self.latencies.append(latency)
+
+    def record_batch(self, request_count, race_count):
+        """記錄一次批次派送"""
+        with self.lock:
+            self.batches += 1
+            self.batched_requests += request_count
+            self.races_simulated += race_count
+
+    def snapshot(self):
+        """取得目前統計快照"""
+        with self.lock:
+            uptime = max(time.time() - self.started_at, 1e-9)
+            latencies = sorted(self.latencies)
+
+            def percentile(p):
+                if not latencies:
+                    return 0.0
+                return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+            return {
+                "uptime_seconds": uptime,
+                "requests": self.requests,
+                "cache_hits": self.cache_hits,
+                "errors": self.errors,
+                "batches": self.batches,
+                "avg_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+                "races_simulated": self.races_simulated,
+                "requests_per_second": self.requests / uptime,
+                "races_per_second": self.races_simulated / uptime,
+                "latency_ms": {
+                    "mean": (sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+                    "p50": percentile(0.50),
+                    "p95": percentile(0.95),
+                    "p99": percentile(0.99)
+                }
+            }
+
+class SimulationService:
+    """常駐模擬服務：批次處理並發請求並派送至預熱的工作程序池"""
+
+    def __init__(self, workers=None, batch_window=DEFAULT_BATCH_WINDOW,
+                 cache_size=DEFAULT_CACHE_SIZE, shard_size=DEFAULT_SHARD_SIZE):
+        """初始化服務"""
+        self.batch_window = batch_window
+        self.cache_size = cache_size
+        self.shard_size = shard_size
+        self.metrics = ServiceMetrics()
+
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker)
+        self._workers = self._pool._max_workers
+        self._queue = queue.Queue()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._running = False
+        self._dispatcher = None
+
+    def start(self):
+        """啟動派送執行緒並預熱所有工作程序"""
+        self._running = True
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatcher.start()
+
+        warmups = [self._pool.submit(_warm_worker) for _ in range(self._workers)]
+        for future in warmups:
+            future.result()
+
+    def stop(self):
+        """停止服務"""
+        self._running = False
+        self._queue.put(None)
+        if self._dispatcher:
+            self._dispatcher.join()
+        self._pool.shutdown(wait=True)
+
+    def simulate(self, config, count=DEFAULT_SIMULATION_COUNT):
+        """模擬指定配置（阻塞直到完成），回傳可序列化的分析結果"""
+        started = time.perf_counter()
+        try:
+            config = normalize_config(config)
+            count = int(count)
+            if count < 1 or count > MAX_SIMULATION_COUNT:
+                raise ValueError(f"模擬次數必須介於1到{MAX_SIMULATION_COUNT}之間")
+        except (ValueError, TypeError) as e:
+            self.metrics.record_request(time.perf_counter() - started, error=True)
+            raise ValueError(str(e))
+
+        key = config_key(config, count)
+
+        # 查詢快取
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.metrics.record_request(time.perf_counter() - started, cache_hit=True)
+            return dict(cached, cached=True)
+
+        # 放入批次佇列等待處理
+        request = _PendingRequest(key, config, count)
+        self._queue.put(request)
+        request.event.wait()
+
+        self.metrics.record_request(time.perf_counter() - started, error=request.error is not None)
+        if request.error is not None:
+            raise RuntimeError(str(request.error))
+        return dict(request.result, cached=False)
+
+    def _cache_get(self, key):
+        """讀取快取並更新最近使用順序"""
+        with self._cache_lock:
+            if key not in self._cache:
+                return None
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+    def _cache_put(self, key, value):
+        """寫入快取，超過容量時移除最久未使用項目"""
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _dispatch_loop(self):
+        """收集批次時間窗內的請求並派送"""
+        while self._running:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            deadline = time.perf_counter() + self.batch_window
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._running = False
+                    break
+                batch.append(item)
+
+            self._dispatch_batch(batch)
+
+    def _dispatch_batch(self, batch):
+        """將相同配置的請求合併，並拆成分片送入程序池"""
+        groups = OrderedDict()
+        for request in batch:
+            groups.setdefault(request.key, []).append(request)
+
+        race_count = 0
+        for requests in groups.values():
+            # 已在等待期間被其他批次完成
+            cached = self._cache_get(requests[0].key)
+            if cached is not None:
+                for request in requests:
+                    request.result = cached
+                    request.event.set()
+                continue
+
+            count = requests[0].count
+            shards = [self.shard_size] * (count // self.shard_size)
+            if count % self.shard_size:
+                shards.append(count % self.shard_size)
+            race_count += count
+
+            job = _BatchJob(self, requests, len(shards))
+            for shard in shards:
+                future = self._pool.submit(simulate_shard, requests[0].config, shard)
+                future.add_done_callback(job.on_shard_done)
+
+        self.metrics.record_batch(len(batch), race_count)
+
+    def _finish_job(self, job):
+        """合併工作完成，回填所有等待中的請求"""
+        result = None
+        if job.error is None:
+            result = analysis_to_json(job.stats.to_analysis())
+            self._cache_put(job.requests[0].key, result)
+
+        for request in job.requests:
+            request.result = result
+            request.error = job.error
+            request.event.set()
+
+class SimulationRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/JSON 請求處理"""
+
+    def do_GET(self):
+        """處理 GET 請求"""
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send_json(200, self.server.service.metrics.snapshot())
+        else:
+            self._send_json(404, {"error": "找不到路徑"})
+
+    def do_POST(self):
+        """處理 POST 請求"""
+        if self.path != "/simulate":
+            self._send_json(404, {"error": "找不到路徑"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+            if not isinstance(body, dict):
+                raise ValueError("請求內容必須是JSON物件")
+            # 允許直接傳入 save_configuration 格式，或包在 config 欄位中
+            config = body.get("config", body)
+            count = body.get("count", DEFAULT_SIMULATION_COUNT)
+            result = self.server.service.simulate(config, count)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_json(200, result)
+
+    def _send_json(self, status, payload):
+        """送出JSON回應"""
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        """關閉預設的逐筆請求日誌"""
+        pass
+
+def create_server(service, port=DEFAULT_PORT):
+    """建立僅限本機連線的HTTP伺服器"""
+    server = ThreadingHTTPServer((DEFAULT_HOST, port), SimulationRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+def main():
+    """服務程式入口"""
+    parser = argparse.ArgumentParser(description="駱駝競速本機模擬服務")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="監聽埠號")
+    parser.add_argument("--workers", type=int, default=None, help="工作程序數量")
+    parser.add_argument("--batch-window", type=float, default=DEFAULT_BATCH_WINDOW,
+                        help="批次收集時間窗（秒）")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="快取配置數量")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="每個分片的模擬次數")
+    args = parser.parse_args()
+
+    service = SimulationService(args.workers, args.batch_window, args.cache_size, args.shard_size)
+    service.start()
+    server = create_server(service, args.port)
+    print(f"模擬服務已啟動: http://{DEFAULT_HOST}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import numpy as np
+
+# 狀態編碼參數：每隻駱駝以 6 位元存 x 座標、5 位元存 y 座標
+X_BITS = 6
+Y_BITS = 5
+CAMEL_BITS = X_BITS + Y_BITS
+X_MASK = (1 << X_BITS) - 1
+Y_MASK = (1 << Y_BITS) - 1
+MAX_PACKED_CAMELS = 64 // CAMEL_BITS  # 單一 uint64 可容納的駱駝數量
+DEFAULT_CHUNK_SIZE = 1 << 18
+
+def _check_range(x, y):
+    """檢查座標是否可被編碼"""
+    if not (0 <= x <= X_MASK and 0 <= y <= Y_MASK):
+        raise ValueError(f"座標超出編碼範圍: x={x}, y={y}")
+
+def pack_state(x_positions, y_positions):
+    """將一組配置編碼為單一整數（駱駝A位於最低位元）
+
+    每隻駱駝的 (x, y) 即唯一決定每一格的堆疊順序，因此編碼是標準形式：
+    相同配置一定得到相同整數，可直接用於雜湊、比較與去重。
+    """
+    code = 0
+    for i, (x, y) in enumerate(zip(x_positions, y_positions)):
+        _check_range(x, y)
+        code |= ((x << Y_BITS) | y) << (i * CAMEL_BITS)
+    return code
+
+def unpack_state(code, camel_count):
+    """將整數解碼回 (x座標列表, y座標列表)"""
+    x_positions = []
+    y_positions = []
+    for i in range(camel_count):
+        field = code >> (i * CAMEL_BITS)
+        x_positions.append((field >> Y_BITS) & X_MASK)
+        y_positions.append(field & Y_MASK)
+    return x_positions, y_positions
+
+def state_bytes(x_positions, y_positions):
+    """將配置編碼為位元組字串（不限駱駝數量）"""
+    data = bytearray()
+    for x, y in zip(x_positions, y_positions):
+        _check_range(x, y)
+        data.append(x)
+        data.append(y)
+    return bytes(data)
+
+def race_state(race):
+    """取得 CamelRace 目前起始配置的整數編碼"""
+    return pack_state(race.x_positions, race.y_positions)
+
+def pack_states(x_positions, y_positions):
+    """批次編碼：輸入 (N, camel_count) 的座標陣列，回傳 uint64 陣列"""
+    xs = np.asarray(x_positions, dtype=np.int64)
+    ys = np.asarray(y_positions, dtype=np.int64)
+    camel_count = xs.shape[1]
+    if camel_count > MAX_PACKED_CAMELS:
+        raise ValueError(f"批次編碼最多支援{MAX_PACKED_CAMELS}隻駱駝")
+    if xs.min(initial=0) < 0 or xs.max(initial=0) > X_MASK or ys.min(initial=0) < 0 or ys.max(initial=0) > Y_MASK:
+        raise ValueError("座標超出編碼範圍")
+
+    shifts = np.arange(camel_count, dtype=np.uint64) * np.uint64(CAMEL_BITS)
+    fields = ((xs << Y_BITS) | ys).astype(np.uint64) << shifts
+    return np.bitwise_or.reduce(fields, axis=1)
+
+def unpack_states(codes, camel_count):
+    """批次解碼：回傳 (N, camel_count) 的 x 與 y 座標陣列"""
+    codes = np.asarray(codes, dtype=np.uint64)
+    shifts = np.arange(camel_count, dtype=np.uint64) * np.uint64(CAMEL_BITS)
+    fields = (codes[:, None] >> shifts).astype(np.int64)
+    return (fields >> Y_BITS) & X_MASK, fields & Y_MASK
+
+def validate_states(x_positions, y_positions, chunk_size=DEFAULT_CHUNK_SIZE):
+    """批次檢查座標合理性，規則與 CamelRace.validate_positions 相同
+
+    同一格的 k 隻駱駝其 y 座標必須恰好是 1..k（單獨駱駝即 y=1）。
+    等價於：每隻駱駝 1 <= y <= 同格駱駝數，且同格駱駝的 y 互不相同。
+    回傳長度為 N 的布林陣列。
+    """
+    xs = np.asarray(x_positions)
+    ys = np.asarray(y_positions)
+    valid = np.empty(len(xs), dtype=bool)
+
+    # 分段處理以限制 (N, n, n) 中間陣列的記憶體用量
+    for start in range(0, len(xs), chunk_size):
+        x = xs[start:start + chunk_size]
+        y = ys[start:start + chunk_size]
+
+        same_x = x[:, :, None] == x[:, None, :]
+        stack_size = same_x.sum(axis=2)
+        same_slot = (same_x & (y[:, :, None] == y[:, None, :])).sum(axis=2)
+
+        ok = (y >= 1) & (y <= stack_size) & (same_slot == 1)
+        valid[start:start + chunk_size] = ok.all(axis=1)
+
+    return valid
+
+def validate_packed(codes, camel_count, chunk_size=DEFAULT_CHUNK_SIZE):
+    """批次檢查已編碼配置的合理性"""
+    codes = np.asarray(codes, dtype=np.uint64)
+    valid = np.empty(len(codes), dtype=bool)
+    for start in range(0, len(codes), chunk_size):
+        xs, ys = unpack_states(codes[start:start + chunk_size], camel_count)
+        valid[start:start + chunk_size] = validate_states(xs, ys, chunk_size)
+    return valid
+
+def unique_states(codes):
+    """去除重複的已編碼配置（回傳排序後的唯一值）"""
+    return np.unique(np.asarray(codes, dtype=np.uint64))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 讓測試可以從專案根目錄匯入 camel_race_* 模組
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,20 @@
+from camel_race_core import CamelRace
+
+def _race(x_positions, tiles):
+    race = CamelRace(seed=1)
+    race.apply_config({"camel_count": 5, "track_length": 15, "x_positions": x_positions,
+                       "y_positions": [1] * 5, "rules": {"tiles": tiles}})
+    return race
+
+def test_start_position_beyond_track_is_rejected():
+    """起始位置超出賽道時驗證失敗，而不是在模擬時查表越界"""
+    valid, error_msg = _race([40, 1, 2, 3, 4], {"5": 1}).validate_positions()
+    assert not valid
+    assert "x=40" in error_msg
+
+def test_tiles_simulate_from_valid_start_positions():
+    """起始位置有效時，含特殊格的比賽可以完整模擬"""
+    race = _race([14, 1, 2, 3, 4], {"5": 1, "9": -2})
+    assert race.validate_positions() == (True, "")
+    analysis = race.analyze_results(race.iter_races(200))
+    assert analysis["total_races"] == 200
@@ -0,0 +1,32 @@
+import math
+
+from camel_race_core import CamelRace
+from camel_race_sampling import importance_sampling
+
+def _race(x_positions, y_positions, seed):
+    race = CamelRace(seed=seed)
+    race.apply_config({"camel_count": 5, "track_length": 15,
+                       "x_positions": x_positions, "y_positions": y_positions})
+    return race
+
+def test_importance_sampling_matches_plain_run():
+    """診斷通過時，重要性抽樣與相同配置的一般蒙地卡羅在標準誤範圍內一致"""
+    result = importance_sampling(_race([1, 5, 5, 6, 6], [1, 1, 2, 1, 2], seed=1), "A")
+    assert result["reliable"]
+    assert result["method"] == "importance"
+
+    count = 100000
+    plain = _race([1, 5, 5, 6, 6], [1, 1, 2, 1, 2], seed=2)
+    probability = plain.analyze_results(plain.iter_races(count))["win_rates"]["A"] / 100
+    plain_error = math.sqrt(probability * (1 - probability) / count)
+
+    tolerance = 4 * math.sqrt(result["std_error"] ** 2 + plain_error ** 2)
+    assert abs(result["probability"] - probability) <= tolerance
+
+def test_importance_sampling_flags_degenerate_weights():
+    """抽樣分佈錯過部分獲勝方式時，改用一般蒙地卡羅並標示結果不可靠"""
+    result = importance_sampling(_race([1, 8, 8, 9, 9], [1, 1, 2, 1, 2], seed=3), "A")
+    assert not result["reliable"]
+    assert result["method"] == "plain"
+    assert result["target_effective_sample_size"] < 50
+    assert result["equivalent_plain_races"] == result["total_races"]